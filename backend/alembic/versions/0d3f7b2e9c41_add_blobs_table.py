@@ -0,0 +1,37 @@
+"""Add blobs table for upload reference counting
+
+Revision ID: 0d3f7b2e9c41
+Revises: f2a6b8c1e5d7
+Create Date: 2026-10-17 19:02:36.774310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0d3f7b2e9c41'
+down_revision = 'f2a6b8c1e5d7'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('blobs',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('refcount', sa.Integer(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=True),
+    sa.Column('content_type', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+    # Existing uploads start with one reference per image row that points at them
+    op.execute(
+        "INSERT INTO blobs (key, refcount) "
+        "SELECT substr(image_url, length('/uploads/') + 1), count(*) FROM ("
+        "  SELECT image_url FROM item_images"
+        "  UNION ALL SELECT image_url FROM variant_images"
+        "  UNION ALL SELECT image_url FROM outfit_images"
+        ") urls WHERE image_url LIKE '/uploads/%' GROUP BY 1"
+    )
+
+def downgrade():
+    op.drop_table('blobs')
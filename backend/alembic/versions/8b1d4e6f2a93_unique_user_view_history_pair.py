@@ -0,0 +1,26 @@
+"""Unique user/item pair in view history
+
+Revision ID: 8b1d4e6f2a93
+Revises: 3f9a2c71d4b8
+Create Date: 2026-10-17 14:05:12.402117
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8b1d4e6f2a93'
+down_revision = '3f9a2c71d4b8'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Keep only the latest row per pair before adding the constraint
+    op.execute(
+        "DELETE FROM user_view_history a USING user_view_history b "
+        "WHERE a.user_id = b.user_id AND a.item_id = b.item_id "
+        "AND (a.viewed_at, a.id) < (b.viewed_at, b.id)"
+    )
+    op.create_unique_constraint('uq_user_view_history_user_item', 'user_view_history', ['user_id', 'item_id'])
+
+def downgrade():
+    op.drop_constraint('uq_user_view_history_user_item', 'user_view_history', type_='unique')
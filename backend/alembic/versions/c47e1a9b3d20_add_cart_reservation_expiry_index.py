@@ -0,0 +1,20 @@
+"""Add cart reservation expiry index
+
+Revision ID: c47e1a9b3d20
+Revises: 8b1d4e6f2a93
+Create Date: 2026-10-17 15:21:47.930512
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c47e1a9b3d20'
+down_revision = '8b1d4e6f2a93'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_cart_items_reservation_expiry', 'cart_items', ['is_reserved', 'reserved_until'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_cart_items_reservation_expiry', table_name='cart_items')
@@ -0,0 +1,25 @@
+"""Add responsive variants to image tables
+
+Revision ID: f2a6b8c1e5d7
+Revises: c47e1a9b3d20
+Create Date: 2026-10-17 17:48:03.215894
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f2a6b8c1e5d7'
+down_revision = 'c47e1a9b3d20'
+branch_labels = None
+depends_on = None
+
+IMAGE_TABLES = ('item_images', 'variant_images', 'outfit_images')
+
+def upgrade():
+    for table in IMAGE_TABLES:
+        op.add_column(table, sa.Column('variants', sa.JSON(), nullable=True))
+
+def downgrade():
+    for table in IMAGE_TABLES:
+        op.drop_column(table, 'variants')
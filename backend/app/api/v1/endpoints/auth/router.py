@@ -6,6 +6,8 @@ from typing import Optional, Annotated
 from app.core.database import get_db
 from app.core.security import get_current_user, oauth2_scheme
 from app.db.models.user import User
+from app.api.v1.endpoints.cart.service import CartService
+from app.api.v1.endpoints.cart.store import GUEST_CART_HEADER
 from . import service
 from .schemas import UserCreate, TokensUserOut, TokensOut, RefreshTokenIn
 
@@ -13,15 +15,25 @@ router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
 @router.post("/register", response_model=TokensUserOut, status_code=status.HTTP_201_CREATED)
-def register(body: service.UserCreate, db: Session = Depends(get_db)):
+def register(
+    body: service.UserCreate,
+    db: Session = Depends(get_db),
+    guest_cart_id: Optional[str] = Header(None, alias=GUEST_CART_HEADER),
+):
     result = service.register(db, body)
     if not result:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    if guest_cart_id:
+        CartService.merge_guest_cart(db, result.user.id, guest_cart_id)
     return result
 
 
 @router.post("/token", response_model=TokensUserOut)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db),
+    guest_cart_id: Optional[str] = Header(None, alias=GUEST_CART_HEADER),
+):
     result = service.login(db, form_data)
     if not result:
         raise HTTPException(
@@ -29,6 +41,8 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if guest_cart_id:
+        CartService.merge_guest_cart(db, result.user.id, guest_cart_id)
     return result
 
 
@@ -38,8 +52,8 @@ async def google_login():
 
 
 @router.get("/google/callback", response_model=TokensUserOut)
-async def google_callback(code: str, db: Session = Depends(get_db)):
-    return await service.google_callback(db, code)
+def google_callback(code: str, db: Session = Depends(get_db)):
+    return service.google_callback(db, code)
 
 
 @router.post("/refresh", response_model=TokensOut)
@@ -55,4 +69,10 @@ def logout(
 ):
     token = authorization.split(" ")[1] if authorization else ""
     service.logout(token, body.refresh_token)
-    return {"message": "Successfully logged out"} 
\ No newline at end of file
+    return {"message": "Successfully logged out"} 
+
+
+@router.post("/logout-all")
+def logout_all(user: User = Depends(get_current_user)):
+    service.logout_all(user)
+    return {"message": "Successfully logged out from all devices"}
@@ -1,11 +1,11 @@
 from datetime import timedelta, datetime
 from urllib.parse import urlencode
-from authlib.integrations.httpx_client import AsyncOAuth2Client
+from authlib.integrations.httpx_client import OAuth2Client
 
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.core.security import get_password_hash, create_access_token, authenticate_user, blacklist_token, decode_token, create_refresh_token, blacklist_refresh_token, decode_refresh_token, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
+from app.core.security import get_password_hash, create_access_token, authenticate_user, blacklist_token, decode_token, create_refresh_token, blacklist_refresh_token, decode_refresh_token, revoke_user_tokens, token_id, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
 from app.core.config import get_settings
 from app.db.models.user import User
 from app.api.v1.endpoints.profile.schemas import ProfileOut
@@ -63,21 +63,23 @@ def google_login():
     return {"auth_url": url}
 
 
-async def google_callback(db: Session, code: str):
+def google_callback(db: Session, code: str):
+    # Sync like the rest of the service: the route runs in the threadpool,
+    # so the DB session and bcrypt (get_password_hash) never block the event loop
     if not code:
         raise HTTPException(status_code=400, detail="Code not provided")
 
-    async with AsyncOAuth2Client(
+    with OAuth2Client(
         client_id=settings.GOOGLE_CLIENT_ID,
         client_secret=settings.GOOGLE_CLIENT_SECRET,
     ) as client:
-        token = await client.fetch_token(
+        token = client.fetch_token(
             GOOGLE_TOKEN_ENDPOINT,
             code=code,
             grant_type="authorization_code",
             redirect_uri=settings.GOOGLE_REDIRECT_URI,
         )
-        resp = await client.get(GOOGLE_USERINFO_ENDPOINT, params={"alt": "json"})
+        resp = client.get(GOOGLE_USERINFO_ENDPOINT, params={"alt": "json"})
     if resp.status_code != 200:
         raise HTTPException(status_code=400, detail="Could not fetch user info from Google")
 
@@ -137,7 +139,7 @@ def refresh_token(body: RefreshTokenIn):
     if exp_ts is not None:
         ttl_calc = int(exp_ts - datetime.utcnow().timestamp())
         ttl = ttl_calc if ttl_calc > 0 else 0
-    blacklist_refresh_token(refresh_token, ttl)
+    blacklist_refresh_token(token_id(rt_payload, refresh_token), ttl)
 
     access_token = create_access_token({"sub": str(sub)})
     new_refresh_token = create_refresh_token({"sub": str(sub)})
@@ -151,7 +153,7 @@ def logout(token: str, refresh_token: str = None):
     if exp_ts is not None:
         ttl_calc = int(exp_ts - datetime.utcnow().timestamp())
         ttl = ttl_calc if ttl_calc > 0 else 0
-    blacklist_token(token, ttl)
+    blacklist_token(token_id(payload, token), ttl)
 
     if refresh_token:
         try:
@@ -161,8 +163,13 @@ def logout(token: str, refresh_token: str = None):
             if exp_ts_rt is not None:
                 ttl_calc_rt = int(exp_ts_rt - datetime.utcnow().timestamp())
                 ttl_rt = ttl_calc_rt if ttl_calc_rt > 0 else 0
-            blacklist_refresh_token(refresh_token, ttl_rt)
+            blacklist_refresh_token(token_id(rt_payload, refresh_token), ttl_rt)
         except HTTPException:
             pass
 
+    return {"detail": "Logout successful"}
+
+
+def logout_all(user: User):
+    revoke_user_tokens(user.id)
     return {"detail": "Logout successful"} 
\ No newline at end of file
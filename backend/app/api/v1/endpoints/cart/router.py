@@ -1,15 +1,19 @@
-from typing import List
-from fastapi import APIRouter, Depends, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, Response, status
 from sqlalchemy.orm import Session
 
+from app.core.config import get_settings
 from app.core.database import get_db
+from app.core.exceptions import NotFoundException
 from app.core.security import get_current_user
 from app.db.models import User, CartItem
 from app.api.v1.endpoints.cart import service as cart_service
 from app.api.v1.endpoints.cart.service import CartService
+from app.api.v1.endpoints.cart.store import GUEST_CART_HEADER, new_guest_cart_id
 from app.api.v1.endpoints.cart.schemas import (
     CartItemCreate,
     CartItemUpdate,
+    CartBulkAdd,
     CartItemResponse,
     CartResponse,
     CartSummary,
@@ -22,6 +26,8 @@ from app.api.v1.endpoints.cart.schemas import (
 
 router = APIRouter(prefix="/cart", tags=["Cart"])
 
+settings = get_settings()
+
 
 def _cart_item_to_response(cart_item: CartItem) -> CartItemResponse:
     """Преобразовать CartItem в CartItemResponse."""
@@ -43,7 +49,7 @@ def _cart_item_to_response(cart_item: CartItem) -> CartItemResponse:
         brand=cart_item.variant.item.brand,
         article=cart_item.variant.item.article,
         slug=cart_item.variant.item.slug,
-        image_urls=[]  # TODO: Добавить изображения
+        image_urls=[cart_item.primary_image_url] if getattr(cart_item, "primary_image_url", None) else []
     )
     
     return CartItemResponse(
@@ -63,22 +69,26 @@ def _cart_item_to_response(cart_item: CartItem) -> CartItemResponse:
     )
 
 
+def _cart_response(items: List[CartItem]) -> CartResponse:
+    return CartResponse(
+        items=[_cart_item_to_response(item) for item in items],
+        summary=CartSummary(**CartService.summarize_cart(items))
+    )
+
+
+def _guest_cart_id(guest_cart_id: Optional[str] = Header(None, alias=GUEST_CART_HEADER)) -> Optional[str]:
+    if not settings.GUEST_CART_ENABLED:
+        raise NotFoundException("Гостевая корзина отключена")
+    return guest_cart_id
+
+
 @router.get("/", response_model=CartResponse)
 def get_cart(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Получить содержимое корзины текущего пользователя."""
-    items = CartService.get_cart_items(db, current_user.id)
-    summary = CartService.get_cart_summary(db, current_user.id)
-    
-    # Подготовка ответа с вложенными данными
-    cart_items = [_cart_item_to_response(item) for item in items]
-    
-    return CartResponse(
-        items=cart_items,
-        summary=CartSummary(**summary)
-    )
+    return _cart_response(CartService.get_cart_items(db, current_user.id))
 
 
 @router.post("/add", response_model=CartItemResponse, status_code=status.HTTP_201_CREATED)
@@ -93,6 +103,80 @@ def add_to_cart(
     return _cart_item_to_response(cart_item)
 
 
+@router.post("/bulk", response_model=CartResponse)
+def bulk_add_to_cart(
+    bulk_data: CartBulkAdd,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Добавить в корзину несколько товаров сразу (все или ни одного)."""
+    items = CartService.bulk_add_to_cart(db, current_user.id, bulk_data)
+    
+    return _cart_response(items)
+
+
+# Гостевая корзина хранится в Redis; идентификатор передаётся в заголовке X-Guest-Cart
+@router.get("/guest", response_model=CartResponse)
+def get_guest_cart(
+    response: Response,
+    guest_cart_id: Optional[str] = Depends(_guest_cart_id),
+    db: Session = Depends(get_db)
+):
+    """Получить гостевую корзину."""
+    if not guest_cart_id:
+        return _cart_response([])
+    response.headers[GUEST_CART_HEADER] = guest_cart_id
+    return _cart_response(CartService.get_guest_cart_items(db, guest_cart_id))
+
+
+@router.post("/guest/add", response_model=CartResponse, status_code=status.HTTP_201_CREATED)
+def add_to_guest_cart(
+    item_data: CartItemCreate,
+    response: Response,
+    guest_cart_id: Optional[str] = Depends(_guest_cart_id),
+    db: Session = Depends(get_db)
+):
+    """Добавить товар в гостевую корзину; новая корзина создаётся при первом добавлении."""
+    guest_cart_id = guest_cart_id or new_guest_cart_id()
+    CartService.add_to_guest_cart(db, guest_cart_id, item_data)
+    response.headers[GUEST_CART_HEADER] = guest_cart_id
+    return _cart_response(CartService.get_guest_cart_items(db, guest_cart_id))
+
+
+@router.patch("/guest/{variant_id}", response_model=CartResponse)
+def update_guest_cart_item(
+    variant_id: int,
+    update_data: CartItemUpdate,
+    response: Response,
+    guest_cart_id: Optional[str] = Depends(_guest_cart_id),
+    db: Session = Depends(get_db)
+):
+    """Обновить товар в гостевой корзине."""
+    if not guest_cart_id:
+        raise NotFoundException("Товар не найден в корзине")
+    CartService.update_guest_cart_item(db, guest_cart_id, variant_id, update_data)
+    response.headers[GUEST_CART_HEADER] = guest_cart_id
+    return _cart_response(CartService.get_guest_cart_items(db, guest_cart_id))
+
+
+@router.delete("/guest/{variant_id}", status_code=status.HTTP_204_NO_CONTENT)
+def remove_from_guest_cart(
+    variant_id: int,
+    guest_cart_id: Optional[str] = Depends(_guest_cart_id)
+):
+    """Удалить товар из гостевой корзины."""
+    if not guest_cart_id:
+        raise NotFoundException("Товар не найден в корзине")
+    CartService.remove_from_guest_cart(guest_cart_id, variant_id)
+
+
+@router.delete("/guest", status_code=status.HTTP_204_NO_CONTENT)
+def clear_guest_cart(guest_cart_id: Optional[str] = Depends(_guest_cart_id)):
+    """Очистить гостевую корзину."""
+    if guest_cart_id:
+        CartService.clear_guest_cart(guest_cart_id)
+
+
 @router.patch("/{cart_item_id}", response_model=CartItemResponse)
 def update_cart_item(
     cart_item_id: int,
@@ -1,6 +1,6 @@
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class CartItemCreate(BaseModel):
@@ -9,6 +9,10 @@ class CartItemCreate(BaseModel):
     notes: Optional[str] = None
 
 
+class CartBulkAdd(BaseModel):
+    items: List[CartItemCreate] = Field(..., min_items=1, max_items=100)
+
+
 class CartItemUpdate(BaseModel):
     quantity: Optional[int] = None
     notes: Optional[str] = None
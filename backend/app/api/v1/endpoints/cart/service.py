@@ -1,11 +1,20 @@
-from typing import List, Optional
+import logging
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import Integer, and_, column, func, select, text, update, values
+from redis.exceptions import RedisError
 
 from app.db.models import CartItem, ItemVariant, Item, User
-from app.api.v1.endpoints.cart.schemas import CartItemCreate, CartItemUpdate
+from app.db.models.item_image import ItemImage
+from app.api.v1.endpoints.cart.schemas import CartItemCreate, CartItemUpdate, CartBulkAdd
+from app.core.config import get_settings
 from app.core.exceptions import NotFoundException, ValidationException
+from app.api.v1.endpoints.cart.store import guest_cart_store
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
 class CartService:
@@ -13,17 +22,70 @@ class CartService:
     
     RESERVATION_DURATION_MINUTES = 30  # Время резервирования в минутах
     
+    # Снимает пачку истекших резервов (SKIP LOCKED — не ждём строки, которые
+    # сейчас меняет пользователь) и одним UPDATE возвращает их в остаток
+    RELEASE_EXPIRED_QUERY = text(
+        """
+        WITH expired AS (
+            UPDATE cart_items SET is_reserved = 0, reserved_until = NULL
+            WHERE id IN (
+                SELECT id FROM cart_items
+                WHERE is_reserved = 1 AND reserved_until < now()
+                ORDER BY id
+                LIMIT :batch_size
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING variant_id, quantity
+        ), released AS (
+            UPDATE item_variants v
+            SET reserved_stock = GREATEST(v.reserved_stock - t.quantity, 0)
+            FROM (
+                SELECT variant_id, SUM(quantity) AS quantity FROM expired GROUP BY variant_id
+            ) t
+            WHERE v.id = t.variant_id
+            RETURNING v.id
+        )
+        SELECT (SELECT count(*) FROM expired) AS cart_items, (SELECT count(*) FROM released) AS variants
+        """
+    )
+    
+    @staticmethod
+    def _primary_image_url():
+        """Коррелированный подзапрос: URL основного (или первого по порядку) изображения товара."""
+        return (
+            select(ItemImage.image_url)
+            .where(ItemImage.item_id == Item.id)
+            .order_by(ItemImage.is_primary.desc(), ItemImage.order, ItemImage.id)
+            .limit(1)
+            .correlate(Item)
+            .scalar_subquery()
+            .label("primary_image_url")
+        )
+    
     @staticmethod
     def get_cart_items(db: Session, user_id: int) -> List[CartItem]:
-        """Получить все товары в корзине пользователя."""
-        # Очистка истекших резервирований
-        CartService._clean_expired_reservations(db, user_id)
+        """Получить все товары в корзине пользователя одним запросом.
         
-        return db.query(CartItem).filter(
-            CartItem.user_id == user_id
+        Вариант, товар и основное изображение загружаются в том же SELECT,
+        так что построение ответа и сводки не делает ленивых запросов.
+        """
+        rows = db.query(CartItem, CartService._primary_image_url()).join(
+            CartItem.variant
+        ).join(
+            ItemVariant.item
         ).options(
-            joinedload(CartItem.variant).joinedload(ItemVariant.item)
+            contains_eager(CartItem.variant).contains_eager(ItemVariant.item)
+        ).filter(
+            CartItem.user_id == user_id
+        ).order_by(
+            CartItem.added_at, CartItem.id
         ).all()
+        
+        cart_items = []
+        for cart_item, image_url in rows:
+            cart_item.primary_image_url = image_url
+            cart_items.append(cart_item)
+        return cart_items
     
     @staticmethod
     def add_to_cart(
@@ -32,85 +94,126 @@ class CartService:
         item_data: CartItemCreate
     ) -> CartItem:
         """Добавить товар в корзину с проверкой доступности."""
-        # Проверка существования варианта
-        variant = db.query(ItemVariant).filter(
+        # Вариант, товар, основное изображение и уже существующая позиция — одним запросом
+        row = db.query(ItemVariant, CartService._primary_image_url(), CartItem).join(
+            ItemVariant.item
+        ).outerjoin(
+            CartItem,
+            and_(CartItem.variant_id == ItemVariant.id, CartItem.user_id == user_id)
+        ).options(
+            contains_eager(ItemVariant.item)
+        ).filter(
             ItemVariant.id == item_data.variant_id
         ).first()
         
-        if not variant:
+        if not row:
             raise NotFoundException("Вариант товара не найден")
         
+        variant, image_url, existing_item = row
+        
         if not variant.is_active:
             raise ValidationException("Вариант товара недоступен")
         
-        # Проверка доступного количества
-        if variant.available_stock < item_data.quantity:
-            raise ValidationException(
-                f"Недостаточное количество товара. Доступно: {variant.available_stock}"
-            )
-        
-        # Проверка существующего товара в корзине
-        existing_item = db.query(CartItem).filter(
-            and_(
-                CartItem.user_id == user_id,
-                CartItem.variant_id == item_data.variant_id
-            )
-        ).first()
-        
         if existing_item:
+            CartService._lock_cart_items(db, [existing_item])
             # Обновляем количество
             new_quantity = existing_item.quantity + item_data.quantity
             
-            if variant.available_stock < new_quantity:
-                raise ValidationException(
-                    f"Недостаточное количество товара. Доступно: {variant.available_stock}"
-                )
+            # Резервирование: если резерв уже истёк, резервируем всё количество заново
+            reserve_quantity = item_data.quantity if existing_item.is_reserved else new_quantity
+            CartService._reserve_stock(db, variant, reserve_quantity)
             
             existing_item.quantity = new_quantity
             existing_item.price_at_time = variant.actual_price
+            existing_item.is_reserved = 1
+            existing_item.reserved_until = datetime.utcnow() + timedelta(
+                minutes=CartService.RESERVATION_DURATION_MINUTES
+            )
             existing_item.updated_at = datetime.utcnow()
-            
+            cart_item = existing_item
+        else:
             # Резервирование
             CartService._reserve_stock(db, variant, item_data.quantity)
             
-            db.commit()
-            db.refresh(existing_item)
-            
-            # Загружаем связанные объекты
-            existing_item = db.query(CartItem).filter(
-                CartItem.id == existing_item.id
-            ).options(
-                joinedload(CartItem.variant).joinedload(ItemVariant.item)
-            ).first()
-            
-            return existing_item
-        
-        # Создание нового элемента корзины
-        cart_item = CartItem(
-            user_id=user_id,
-            variant_id=item_data.variant_id,
-            quantity=item_data.quantity,
-            price_at_time=variant.actual_price,
-            is_reserved=1,
-            reserved_until=datetime.utcnow() + timedelta(minutes=CartService.RESERVATION_DURATION_MINUTES),
-            notes=item_data.notes
-        )
+            # Создание нового элемента корзины
+            cart_item = CartItem(
+                user_id=user_id,
+                variant=variant,
+                quantity=item_data.quantity,
+                price_at_time=variant.actual_price,
+                is_reserved=1,
+                reserved_until=datetime.utcnow() + timedelta(minutes=CartService.RESERVATION_DURATION_MINUTES),
+                notes=item_data.notes
+            )
+            db.add(cart_item)
         
-        # Резервирование
-        CartService._reserve_stock(db, variant, item_data.quantity)
+        CartService._commit_keeping_loaded(db)
+        cart_item.primary_image_url = image_url
         
-        db.add(cart_item)
-        db.commit()
-        db.refresh(cart_item)
+        return cart_item
+    
+    @staticmethod
+    def bulk_add_to_cart(db: Session, user_id: int, bulk_data: CartBulkAdd) -> List[CartItem]:
+        """Добавить в корзину несколько вариантов в одной транзакции: либо все, либо ничего."""
+        # Повторы одного варианта в запросе складываем
+        quantities: Dict[int, int] = {}
+        notes: Dict[int, str] = {}
+        for line in bulk_data.items:
+            if line.quantity <= 0:
+                raise ValidationException("Количество должно быть больше нуля")
+            quantities[line.variant_id] = quantities.get(line.variant_id, 0) + line.quantity
+            if line.notes is not None:
+                notes[line.variant_id] = line.notes
         
-        # Загружаем связанные объекты
-        cart_item = db.query(CartItem).filter(
-            CartItem.id == cart_item.id
-        ).options(
-            joinedload(CartItem.variant).joinedload(ItemVariant.item)
-        ).first()
+        rows = db.query(ItemVariant, CartItem).outerjoin(
+            CartItem,
+            and_(CartItem.variant_id == ItemVariant.id, CartItem.user_id == user_id)
+        ).filter(
+            ItemVariant.id.in_(quantities)
+        ).all()
+        variants = {variant.id: (variant, existing_item) for variant, existing_item in rows}
+        CartService._lock_cart_items(db, [existing_item for _, existing_item in rows if existing_item])
         
-        return cart_item
+        missing = sorted(set(quantities) - set(variants))
+        if missing:
+            raise NotFoundException(f"Варианты товара не найдены: {missing}")
+        inactive = sorted(variant_id for variant_id, (variant, _) in variants.items() if not variant.is_active)
+        if inactive:
+            raise ValidationException(f"Варианты товара недоступны: {inactive}")
+        
+        # Резервируем только то, что ещё не удержано действующим резервом позиции
+        to_reserve = {}
+        for variant_id, quantity in quantities.items():
+            existing_item = variants[variant_id][1]
+            to_reserve[variant_id] = quantity if existing_item and existing_item.is_reserved else (
+                quantity + (existing_item.quantity if existing_item else 0)
+            )
+        CartService._reserve_many(db, {vid: variants[vid][0] for vid in to_reserve}, to_reserve)
+        
+        reserved_until = datetime.utcnow() + timedelta(minutes=CartService.RESERVATION_DURATION_MINUTES)
+        for variant_id, quantity in quantities.items():
+            variant, existing_item = variants[variant_id]
+            if existing_item:
+                existing_item.quantity += quantity
+                existing_item.price_at_time = variant.actual_price
+                existing_item.is_reserved = 1
+                existing_item.reserved_until = reserved_until
+                existing_item.updated_at = datetime.utcnow()
+                if variant_id in notes:
+                    existing_item.notes = notes[variant_id]
+            else:
+                db.add(CartItem(
+                    user_id=user_id,
+                    variant=variant,
+                    quantity=quantity,
+                    price_at_time=variant.actual_price,
+                    is_reserved=1,
+                    reserved_until=reserved_until,
+                    notes=notes.get(variant_id)
+                ))
+        
+        db.commit()
+        return CartService.get_cart_items(db, user_id)
     
     @staticmethod
     def update_cart_item(
@@ -120,31 +223,33 @@ class CartService:
         update_data: CartItemUpdate
     ) -> CartItem:
         """Обновить количество товара в корзине."""
-        cart_item = db.query(CartItem).filter(
+        row = db.query(CartItem, CartService._primary_image_url()).join(
+            CartItem.variant
+        ).join(
+            ItemVariant.item
+        ).options(
+            contains_eager(CartItem.variant).contains_eager(ItemVariant.item)
+        ).filter(
             and_(
                 CartItem.id == cart_item_id,
                 CartItem.user_id == user_id
             )
-        ).first()
+        ).with_for_update(of=CartItem).populate_existing().first()
         
-        if not cart_item:
+        if not row:
             raise NotFoundException("Товар не найден в корзине")
         
+        cart_item, image_url = row
+        
         if update_data.quantity is not None:
             variant = cart_item.variant
             
-            # Проверка доступности нового количества
+            # Обновление резервирования на разницу с уже зарезервированным количеством
             current_reserved = cart_item.quantity if cart_item.is_reserved else 0
             new_reserved = update_data.quantity - current_reserved
             
-            if variant.available_stock < new_reserved:
-                raise ValidationException(
-                    f"Недостаточное количество товара. Доступно: {variant.available_stock + current_reserved}"
-                )
-            
-            # Обновление резервирования
             if new_reserved > 0:
-                CartService._reserve_stock(db, variant, new_reserved)
+                CartService._reserve_stock(db, variant, new_reserved, already_reserved=current_reserved)
             elif new_reserved < 0:
                 CartService._release_stock(db, variant, abs(new_reserved))
             
@@ -152,40 +257,35 @@ class CartService:
             cart_item.updated_at = datetime.utcnow()
             
             # Продление резервирования
-            if cart_item.is_reserved:
-                cart_item.reserved_until = datetime.utcnow() + timedelta(
-                    minutes=CartService.RESERVATION_DURATION_MINUTES
-                )
+            cart_item.is_reserved = 1
+            cart_item.reserved_until = datetime.utcnow() + timedelta(
+                minutes=CartService.RESERVATION_DURATION_MINUTES
+            )
         
         if update_data.notes is not None:
             cart_item.notes = update_data.notes
         
-        db.commit()
-        db.refresh(cart_item)
-        
-        # Загружаем связанные объекты
-        cart_item = db.query(CartItem).filter(
-            CartItem.id == cart_item.id
-        ).options(
-            joinedload(CartItem.variant).joinedload(ItemVariant.item)
-        ).first()
+        CartService._commit_keeping_loaded(db)
+        cart_item.primary_image_url = image_url
         
         return cart_item
     
     @staticmethod
     def remove_from_cart(db: Session, user_id: int, cart_item_id: int) -> bool:
         """Удалить товар из корзины."""
+        # Блокировка строки: иначе сборщик истёкших резервов может освободить
+        # тот же резерв одновременно с нами (см. _lock_cart_items)
         cart_item = db.query(CartItem).filter(
             and_(
                 CartItem.id == cart_item_id,
                 CartItem.user_id == user_id
             )
-        ).first()
+        ).with_for_update().populate_existing().first()
         
         if not cart_item:
             raise NotFoundException("Товар не найден в корзине")
         
-        # Освобождение резервирования
+        # Освобождение резервирования (флаг прочитан уже под блокировкой)
         if cart_item.is_reserved and cart_item.variant:
             CartService._release_stock(db, cart_item.variant, cart_item.quantity)
         
@@ -199,16 +299,19 @@ class CartService:
         """Очистить корзину пользователя."""
         cart_items = db.query(CartItem).filter(
             CartItem.user_id == user_id
-        ).all()
+        ).order_by(CartItem.id).with_for_update().populate_existing().all()
         
-        # Освобождение всех резервирований
+        # Освобождение всех резервирований (флаги прочитаны под блокировкой)
         for item in cart_items:
             if item.is_reserved and item.variant:
                 CartService._release_stock(db, item.variant, item.quantity)
         
-        db.query(CartItem).filter(
-            CartItem.user_id == user_id
-        ).delete()
+        # Удаляем только заблокированные строки: добавленные после чтения
+        # позиции со своими резервами не трогаем
+        if cart_items:
+            db.query(CartItem).filter(
+                CartItem.id.in_([item.id for item in cart_items])
+            ).delete(synchronize_session=False)
         
         db.commit()
         
@@ -217,8 +320,11 @@ class CartService:
     @staticmethod
     def get_cart_summary(db: Session, user_id: int) -> dict:
         """Получить сводку по корзине."""
-        cart_items = CartService.get_cart_items(db, user_id)
-        
+        return CartService.summarize_cart(CartService.get_cart_items(db, user_id))
+    
+    @staticmethod
+    def summarize_cart(cart_items: List[CartItem]) -> dict:
+        """Посчитать сводку по уже загруженным позициям корзины."""
         total = 0.0
         total_items = 0
         unavailable_items = []
@@ -244,33 +350,281 @@ class CartService:
         }
     
     @staticmethod
-    def _reserve_stock(db: Session, variant: ItemVariant, quantity: int):
-        """Зарезервировать товар."""
-        variant.reserved_stock += quantity
-        db.add(variant)
+    def get_guest_cart_items(db: Session, guest_id: str) -> List[CartItem]:
+        """Позиции гостевой корзины из Redis как несохраняемые CartItem (id = id варианта).
+        
+        Гостевые позиции не резервируют товар: доступность считается при чтении,
+        резерв появляется после входа и слияния с корзиной пользователя.
+        """
+        lines = guest_cart_store.lines(guest_id)
+        if not lines:
+            return []
+        
+        rows = db.query(ItemVariant, CartService._primary_image_url()).join(
+            ItemVariant.item
+        ).options(
+            contains_eager(ItemVariant.item)
+        ).filter(
+            ItemVariant.id.in_(lines)
+        ).all()
+        
+        cart_items = []
+        for variant, image_url in rows:
+            line = lines[variant.id]
+            cart_item = CartItem(
+                id=variant.id,
+                variant_id=variant.id,
+                quantity=line["quantity"],
+                is_reserved=0,
+                notes=line.get("notes"),
+                added_at=datetime.fromisoformat(line["added_at"]),
+                updated_at=datetime.fromisoformat(line["updated_at"]),
+            )
+            # Без событий relationship, чтобы объект не попал в сессию через backref
+            set_committed_value(cart_item, "variant", variant)
+            cart_item.primary_image_url = image_url
+            cart_items.append(cart_item)
+        
+        cart_items.sort(key=lambda cart_item: cart_item.added_at)
+        return cart_items
+    
+    @staticmethod
+    def _check_guest_quantity(db: Session, variant_id: int, quantity: int) -> ItemVariant:
+        variant = db.get(ItemVariant, variant_id)
+        if not variant:
+            raise NotFoundException("Вариант товара не найден")
+        if not variant.is_active:
+            raise ValidationException("Вариант товара недоступен")
+        if quantity <= 0:
+            raise ValidationException("Количество должно быть больше нуля")
+        if variant.available_stock < quantity:
+            raise ValidationException(
+                f"Недостаточное количество товара. Доступно: {variant.available_stock}"
+            )
+        return variant
     
     @staticmethod
-    def _release_stock(db: Session, variant: ItemVariant, quantity: int):
-        """Освободить зарезервированный товар."""
-        variant.reserved_stock = max(0, variant.reserved_stock - quantity)
-        db.add(variant)
+    def add_to_guest_cart(db: Session, guest_id: str, item_data: CartItemCreate) -> None:
+        """Добавить товар в гостевую корзину."""
+        existing = guest_cart_store.get_line(guest_id, item_data.variant_id)
+        quantity = item_data.quantity + (existing["quantity"] if existing else 0)
+        CartService._check_guest_quantity(db, item_data.variant_id, quantity)
+        guest_cart_store.put_line(
+            guest_id,
+            item_data.variant_id,
+            quantity,
+            notes=item_data.notes if item_data.notes is not None else (existing or {}).get("notes"),
+            added_at=existing["added_at"] if existing else None,
+        )
     
     @staticmethod
-    def _clean_expired_reservations(db: Session, user_id: int):
-        """Очистить истекшие резервирования."""
-        expired_items = db.query(CartItem).filter(
-            and_(
-                CartItem.user_id == user_id,
-                CartItem.is_reserved == 1,
-                CartItem.reserved_until < datetime.utcnow()
+    def update_guest_cart_item(db: Session, guest_id: str, variant_id: int, update_data: CartItemUpdate) -> None:
+        """Обновить позицию гостевой корзины."""
+        existing = guest_cart_store.get_line(guest_id, variant_id)
+        if not existing:
+            raise NotFoundException("Товар не найден в корзине")
+        
+        quantity = existing["quantity"]
+        if update_data.quantity is not None:
+            CartService._check_guest_quantity(db, variant_id, update_data.quantity)
+            quantity = update_data.quantity
+        
+        guest_cart_store.put_line(
+            guest_id,
+            variant_id,
+            quantity,
+            notes=update_data.notes if update_data.notes is not None else existing.get("notes"),
+            added_at=existing["added_at"],
+        )
+    
+    @staticmethod
+    def remove_from_guest_cart(guest_id: str, variant_id: int) -> bool:
+        """Удалить товар из гостевой корзины."""
+        if not guest_cart_store.remove_line(guest_id, variant_id):
+            raise NotFoundException("Товар не найден в корзине")
+        return True
+    
+    @staticmethod
+    def clear_guest_cart(guest_id: str) -> bool:
+        """Очистить гостевую корзину."""
+        guest_cart_store.clear(guest_id)
+        return True
+    
+    @staticmethod
+    def merge_guest_cart(db: Session, user_id: int, guest_id: str) -> int:
+        """Перенести гостевую корзину в корзину пользователя при входе.
+        
+        Сначала пробуем добавить всё одной транзакцией; если часть товаров
+        закончилась или пропала, переносим позиции по одной и пропускаем
+        недоступные. Возвращает количество перенесённых позиций.
+        
+        `take` забирает корзину атомарно, поэтому два параллельных входа не
+        перенесут её дважды. Если перенос упал не из-за доступности товара
+        (БД, сеть), ещё не перенесённые позиции возвращаются в Redis.
+        """
+        if not settings.GUEST_CART_ENABLED:
+            return 0
+        try:
+            lines = guest_cart_store.take(guest_id)
+        except RedisError:
+            logger.warning("Failed to read guest cart %s for merge", guest_id, exc_info=True)
+            return 0
+        if not lines:
+            return 0
+        
+        items = [
+            CartItemCreate(variant_id=variant_id, quantity=line["quantity"], notes=line.get("notes"))
+            for variant_id, line in lines.items()
+        ]
+        pending = dict(lines)
+        try:
+            try:
+                CartService.bulk_add_to_cart(db, user_id, CartBulkAdd.construct(items=items))
+                return len(items)
+            except (NotFoundException, ValidationException):
+                db.rollback()
+            
+            merged = 0
+            for item in items:
+                try:
+                    CartService.add_to_cart(db, user_id, item)
+                    merged += 1
+                except (NotFoundException, ValidationException):
+                    # Недоступная позиция отбрасывается, как и раньше
+                    db.rollback()
+                pending.pop(item.variant_id)
+            return merged
+        except Exception:
+            db.rollback()
+            try:
+                guest_cart_store.restore(guest_id, pending)
+            except RedisError:
+                logger.error("Failed to restore guest cart %s after a failed merge", guest_id, exc_info=True)
+            raise
+    
+    @staticmethod
+    def _reserve_stock(db: Session, variant: ItemVariant, quantity: int, already_reserved: int = 0):
+        """Зарезервировать товар одним условным UPDATE.
+        
+        Проверка остатка и увеличение резерва выполняются атомарно в БД,
+        поэтому параллельные добавления одного SKU не могут продать больше,
+        чем есть на складе, и не требуют блокировок строки.
+        """
+        row = db.execute(
+            update(ItemVariant)
+            .where(
+                ItemVariant.id == variant.id,
+                ItemVariant.stock - ItemVariant.reserved_stock >= quantity,
             )
+            .values(reserved_stock=ItemVariant.reserved_stock + quantity)
+            .returning(ItemVariant.stock, ItemVariant.reserved_stock)
+            .execution_options(synchronize_session=False)
+        ).first()
+        
+        if row is None:
+            available = db.query(ItemVariant.stock - ItemVariant.reserved_stock).filter(
+                ItemVariant.id == variant.id
+            ).scalar() or 0
+            raise ValidationException(
+                f"Недостаточное количество товара. Доступно: {max(0, available) + already_reserved}"
+            )
+        
+        CartService._sync_stock(variant, row)
+    
+    @staticmethod
+    def _reserve_many(db: Session, variants: Dict[int, ItemVariant], quantities: Dict[int, int]):
+        """Зарезервировать несколько вариантов одним UPDATE ... FROM (VALUES ...).
+        
+        Если хотя бы для одного варианта не хватает остатка, транзакция
+        откатывается целиком и ни один резерв не остаётся.
+        """
+        lines = values(
+            column("variant_id", Integer), column("quantity", Integer), name="lines"
+        ).data(list(quantities.items()))
+        rows = db.execute(
+            update(ItemVariant)
+            .where(
+                ItemVariant.id == lines.c.variant_id,
+                ItemVariant.stock - ItemVariant.reserved_stock >= lines.c.quantity,
+            )
+            .values(reserved_stock=ItemVariant.reserved_stock + lines.c.quantity)
+            .returning(ItemVariant.id, ItemVariant.stock, ItemVariant.reserved_stock)
+            .execution_options(synchronize_session=False)
         ).all()
         
-        for item in expired_items:
-            if item.variant:
-                CartService._release_stock(db, item.variant, item.quantity)
-            item.is_reserved = 0
-            item.reserved_until = None
+        reserved = {row.id for row in rows}
+        if len(reserved) < len(quantities):
+            unavailable = [
+                f"{variant_id} (доступно: {variants[variant_id].available_stock})"
+                for variant_id in sorted(set(quantities) - reserved)
+            ]
+            db.rollback()
+            raise ValidationException(f"Недостаточное количество товара: {', '.join(unavailable)}")
         
-        if expired_items:
-            db.commit() 
\ No newline at end of file
+        for row in rows:
+            CartService._sync_stock(variants[row.id], row)
+    
+    @staticmethod
+    def _release_stock(db: Session, variant: ItemVariant, quantity: int):
+        """Освободить зарезервированный товар."""
+        row = db.execute(
+            update(ItemVariant)
+            .where(ItemVariant.id == variant.id)
+            .values(reserved_stock=func.greatest(ItemVariant.reserved_stock - quantity, 0))
+            .returning(ItemVariant.stock, ItemVariant.reserved_stock)
+            .execution_options(synchronize_session=False)
+        ).first()
+        
+        if row is not None:
+            CartService._sync_stock(variant, row)
+    
+    @staticmethod
+    def _lock_cart_items(db: Session, cart_items: List[CartItem]):
+        """Заблокировать позиции корзины и перечитать их количество и флаг резерва.
+        
+        Без блокировки сборщик истёкших резервов может снять резерв между
+        чтением позиции и обновлением: тогда дорезервировалась бы только
+        разница, а reserved_stock остался бы заниженным. Сборщик пропускает
+        заблокированные строки (SKIP LOCKED), а уже снятый им резерв виден
+        после перечитывания.
+        """
+        if not cart_items:
+            return
+        db.query(CartItem).filter(
+            CartItem.id.in_([cart_item.id for cart_item in cart_items])
+        ).order_by(CartItem.id).with_for_update().populate_existing().all()
+    
+    @staticmethod
+    def _commit_keeping_loaded(db: Session):
+        """Закоммитить, не сбрасывая загруженные объекты.
+        
+        Ответ строится из уже загруженных позиции, варианта и товара;
+        серверные значения (id, added_at) приходят через RETURNING
+        (eager_defaults у CartItem), так что повторный SELECT не нужен.
+        """
+        expire_on_commit = db.expire_on_commit
+        db.expire_on_commit = False
+        try:
+            db.commit()
+        finally:
+            db.expire_on_commit = expire_on_commit
+    
+    @staticmethod
+    def _sync_stock(variant: ItemVariant, row):
+        """Подставить значения из RETURNING в загруженный объект без лишнего SELECT."""
+        set_committed_value(variant, "stock", row.stock)
+        set_committed_value(variant, "reserved_stock", row.reserved_stock)
+    
+    @staticmethod
+    def release_expired_reservations(db: Session, batch_size: int = 1000) -> dict:
+        """Вернуть в остаток истекшие резервирования всех пользователей."""
+        released_items = 0
+        released_variants = 0
+        while True:
+            row = db.execute(CartService.RELEASE_EXPIRED_QUERY, {"batch_size": batch_size}).one()
+            db.commit()
+            released_items += row.cart_items
+            released_variants += row.variants
+            if row.cart_items < batch_size:
+                break
+        return {"cart_items": released_items, "variants": released_variants} 
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""Хранилище гостевых корзин в Redis.
+
+Корзина — хэш `cart:guest:<id>`: поле — id варианта, значение — JSON
+с количеством, заметкой и временем добавления. Изменения гостевой корзины
+не создают строк в `cart_items`; в Postgres содержимое попадает один раз,
+при входе пользователя (`CartService.merge_guest_cart`).
+"""
+
+import json
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.core.config import get_settings
+from app.core.redis_client import get_redis
+
+settings = get_settings()
+
+GUEST_CART_HEADER = "X-Guest-Cart"
+
+
+def new_guest_cart_id() -> str:
+    return uuid.uuid4().hex
+
+
+class RedisCartStore:
+    """Операции над гостевой корзиной; TTL продлевается при каждом изменении."""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _key(guest_id: str) -> str:
+        return f"cart:guest:{guest_id}"
+
+    def lines(self, guest_id: str) -> Dict[int, dict]:
+        raw = get_redis().hgetall(self._key(guest_id))
+        return {int(variant_id): json.loads(value) for variant_id, value in raw.items()}
+
+    def get_line(self, guest_id: str, variant_id: int) -> Optional[dict]:
+        value = get_redis().hget(self._key(guest_id), variant_id)
+        return json.loads(value) if value else None
+
+    def put_line(self, guest_id: str, variant_id: int, quantity: int, notes: Optional[str] = None,
+                 added_at: Optional[str] = None) -> None:
+        line = {
+            "quantity": quantity,
+            "notes": notes,
+            "added_at": added_at or datetime.utcnow().isoformat(),
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        key = self._key(guest_id)
+        pipe = get_redis().pipeline()
+        pipe.hset(key, variant_id, json.dumps(line))
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def remove_line(self, guest_id: str, variant_id: int) -> bool:
+        return get_redis().hdel(self._key(guest_id), variant_id) == 1
+
+    def clear(self, guest_id: str) -> None:
+        get_redis().delete(self._key(guest_id))
+
+    def take(self, guest_id: str) -> Dict[int, dict]:
+        """Атомарно забрать содержимое корзины и удалить её (слияние при входе)."""
+        key = self._key(guest_id)
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.hgetall(key)
+        pipe.delete(key)
+        raw, _ = pipe.execute()
+        return {int(variant_id): json.loads(value) for variant_id, value in raw.items()}
+
+    def restore(self, guest_id: str, lines: Dict[int, dict]) -> None:
+        """Вернуть забранные `take` позиции; изменения, сделанные после, не перезаписываются."""
+        if not lines:
+            return
+        key = self._key(guest_id)
+        pipe = get_redis().pipeline(transaction=True)
+        for variant_id, line in lines.items():
+            pipe.hsetnx(key, variant_id, json.dumps(line))
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+
+guest_cart_store = RedisCartStore(settings.GUEST_CART_TTL_SECONDS)
@@ -1,8 +1,10 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, status, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, status, Query, UploadFile, File, Form, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db, get_async_read_db
+from app.core.pagination import NEXT_CURSOR_HEADER
 from app.core.security import require_admin, get_current_user_optional, get_current_user
 from app.db.models.user import User
 from . import service
@@ -32,6 +34,7 @@ async def create_item(
 
 @router.get("/", response_model=List[ItemOut])
 def list_items(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     q: Optional[str] = None,
@@ -43,7 +46,8 @@ def list_items(
     size: Optional[str] = None,
     sort_by: Optional[str] = None,
     clothing_type: Optional[str] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     user: Optional[User] = Depends(get_current_user_optional),
 ):
     filters = {
@@ -57,17 +61,20 @@ def list_items(
         "sort_by": sort_by,
         "clothing_type": clothing_type,
     }
-    return service.list_items(db, filters, skip, limit, user.id if user else None)
+    items, next_cursor = service.list_items(db, filters, skip, limit, user.id if user else None, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
 
 
 @router.get("/trending", response_model=List[ItemOut])
-def trending_items(limit: int = 20, db: Session = Depends(get_db)):
-    return service.trending_items(db, limit)
+async def trending_items(limit: int = 20, db: AsyncSession = Depends(get_async_read_db)):
+    return await service.trending_items(db, limit)
 
 
 @router.get("/collections", response_model=List[ItemOut])
-def items_by_collection(name: str, db: Session = Depends(get_db)):
-    return service.items_by_collection(db, name)
+async def items_by_collection(name: str, db: AsyncSession = Depends(get_async_read_db)):
+    return await service.items_by_collection(db, name)
 
 
 @router.get("/favorites", response_model=List[ItemOut])
@@ -76,8 +83,17 @@ def list_favorite_items(db: Session = Depends(get_db), user: User = Depends(get_
 
 
 @router.get("/history", response_model=List[ItemOut])
-def viewed_items(limit: int = 50, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    return service.viewed_items(db, user, limit)
+def viewed_items(
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    user: User = Depends(get_current_user),
+):
+    items, next_cursor = service.viewed_items(db, user, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
 
 
 @router.delete("/history", status_code=status.HTTP_204_NO_CONTENT)
@@ -101,8 +117,8 @@ def delete_item(item_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/{item_id}/similar", response_model=List[ItemOut])
-def similar_items(item_id: int, limit: int = 10, db: Session = Depends(get_db)):
-    return service.similar_items(db, item_id, limit)
+async def similar_items(item_id: int, limit: int = 10, db: AsyncSession = Depends(get_async_read_db)):
+    return await service.similar_items(db, item_id, limit)
 
 
 @router.post("/{item_id}/favorite", status_code=status.HTTP_200_OK)
@@ -116,7 +132,7 @@ def add_item_comment(item_id: int, payload: CommentCreate, db: Session = Depends
 
 
 @router.get("/{item_id}/comments", response_model=List[CommentOut])
-def list_item_comments(item_id: int, db: Session = Depends(get_db)):
+def list_item_comments(item_id: int, db: Session = Depends(get_read_db)):
     return service.list_item_comments(db, item_id)
 
 
@@ -135,7 +151,7 @@ def delete_item_comment(
 
 
 @router.get("/{item_id}/variants", response_model=List[VariantOut])
-def list_variants(item_id: int, db: Session = Depends(get_db)):
+def list_variants(item_id: int, db: Session = Depends(get_read_db)):
     return service.list_variants(db, item_id)
 
 
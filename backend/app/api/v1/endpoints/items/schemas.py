@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, conint, confloat
 from datetime import datetime
 
@@ -60,6 +60,18 @@ class VariantOut(VariantBase):
         orm_mode = True
 
 
+class ItemImageOut(BaseModel):
+    id: int
+    image_url: str
+    thumbnail_url: Optional[str] = None
+    # {"webp": {"320": url, "640": url, ...}, "avif": {...}}
+    variants: Optional[Dict[str, Dict[str, str]]] = None
+    is_primary: Optional[bool] = None
+
+    class Config:
+        orm_mode = True
+
+
 class ItemOut(ItemCreate):
     id: int
     created_at: Optional[datetime] = None
@@ -67,6 +79,7 @@ class ItemOut(ItemCreate):
     style: Optional[str] = None
     collection: Optional[str] = None
     image_urls: Optional[List[str]] = None
+    images: Optional[List[ItemImageOut]] = None
     variants: Optional[List[VariantOut]] = None
     is_favorite: Optional[bool] = None
 
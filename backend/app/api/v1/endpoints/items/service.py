@@ -1,10 +1,26 @@
+import asyncio
+import hashlib
 import os
 import uuid
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
 from fastapi import UploadFile, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func, desc
-
+from sqlalchemy import and_, func, desc, select
+
+from app.core.cache import ITEMS_TAG, invalidate_tags
+from app.core.config import get_settings
+from app.core.storage import acquire_blob, delete_blobs, get_blob_store, key_from_url, release_image_blobs, url_for_key
+from app.core.pagination import keyset_paginate
+from app.core.search import get_search_engine
+from app.core.trending import TRENDING_ITEMS_KEY, top_ids
+from app.core.view_events import record_item_view
+from app.tasks.image_tasks import enqueue_image_variants
+from app.db.loaders import item_out_options
 from app.db.models.item import Item
 from app.db.models.user import User
 from app.db.models.associations import user_favorite_items, UserView
@@ -14,33 +30,61 @@ from app.db.models.item_image import ItemImage
 from .schemas import ItemUpdate, VariantCreate, VariantUpdate, CommentCreate
 
 
-UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads/items")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-
-def _save_upload_file(upload: UploadFile, subdir: str = "") -> str:
-    """Save uploaded file and return relative path accessible via /uploads."""
-    filename = f"{uuid.uuid4().hex}_{upload.filename}"
-    dir_path = os.path.join(UPLOAD_DIR, subdir) if subdir else UPLOAD_DIR
-    os.makedirs(dir_path, exist_ok=True)
-    file_path = os.path.join(dir_path, filename)
-    with open(file_path, "wb") as f:
-        f.write(upload.file.read())
-    return f"/uploads/items/{subdir + '/' if subdir else ''}{filename}"
-
-
-def _remove_upload_file(url: str):
-    """Remove file from filesystem based on its public URL path."""
-    if not url or not url.startswith("/uploads/"):
-        return
-    # Convert URL path to filesystem path
-    # Example: /uploads/items/file.jpg -> uploads/items/file.jpg
-    fs_path = url.lstrip("/").replace("/", os.sep)
-    if os.path.exists(fs_path):
-        try:
-            os.remove(fs_path)
-        except OSError:
-            pass
+settings = get_settings()
+
+UPLOAD_SUBDIR = "items"
+UPLOAD_TMP_DIR = os.path.join(settings.UPLOAD_ROOT, ".tmp")
+os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_SIZE = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+
+
+async def _save_upload_file(upload: UploadFile, subdir: str = UPLOAD_SUBDIR) -> Tuple[str, bool]:
+    """Stream an upload into the blob store and return (URL under /uploads, whether a new blob was stored).
+
+    The blob key is the sha256 of the content, so re-uploading the same
+    image reuses the existing blob instead of storing another copy.
+    """
+    if upload.content_type and not upload.content_type.startswith("image/"):
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Only image uploads are allowed")
+
+    store = get_blob_store()
+    tmp_path = os.path.join(UPLOAD_TMP_DIR, f"{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Image exceeds {settings.MAX_UPLOAD_SIZE_MB} MB",
+                    )
+                digest.update(chunk)
+                await out.write(chunk)
+
+        extension = os.path.splitext(upload.filename or "")[1].lower()
+        key = f"{subdir}/{digest.hexdigest()}{extension}"
+        created = not await run_in_threadpool(store.exists, key)
+        if created:
+            await run_in_threadpool(store.put_file, tmp_path, key, upload.content_type)
+    finally:
+        if await aiofiles.os.path.exists(tmp_path):
+            await aiofiles.os.remove(tmp_path)
+    return url_for_key(key), created
+
+
+async def _save_upload_files(uploads: List[UploadFile]) -> List[str]:
+    """Save several uploads concurrently; on any failure remove the blobs this call created."""
+    results = await asyncio.gather(*(_save_upload_file(upload) for upload in uploads), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        created = [key_from_url(result[0]) for result in results if not isinstance(result, BaseException) and result[1]]
+        await run_in_threadpool(delete_blobs, *created)
+        raise errors[0]
+    return [url for url, _ in results]
 
 
 def _comment_with_likes(comment: Comment):
@@ -64,18 +108,13 @@ async def create_item(
     images: Optional[List[UploadFile]],
     image_url: Optional[str],
 ):
-    primary_image_url: Optional[str] = None
     image_urls: List[str] = []
 
     if images:
-        for idx, upload in enumerate(images):
-            url = _save_upload_file(upload)
-            image_urls.append(url)
-            if idx == 0:
-                primary_image_url = url
+        image_urls = await _save_upload_files(images)
 
-    if not primary_image_url and image_url:
-        primary_image_url = image_url
+    if not image_urls and image_url:
+        image_urls = [image_url]
 
     db_item = Item(
         name=name,
@@ -87,21 +126,50 @@ async def create_item(
         style=style,
         collection=collection,
     )
+    # The sync session must not block the event loop
+    return await run_in_threadpool(_insert_item, db, db_item, image_urls)
 
+
+def _insert_item(db: Session, db_item: Item, image_urls: List[str]) -> Item:
     db.add(db_item)
     db.commit()
     db.refresh(db_item)
 
     for position, url in enumerate(image_urls):
-        db.add(ItemImage(item_id=db_item.id, image_url=url, position=position))
+        db.add(ItemImage(item_id=db_item.id, image_url=url, order=position, is_primary=position == 0))
+        key = key_from_url(url)
+        if key:
+            acquire_blob(db, key)
     db.commit()
     db.refresh(db_item)
-
+    invalidate_tags(ITEMS_TAG)
+    enqueue_image_variants("item", [image.id for image in db_item.images])
     return db_item
 
 
-def list_items(db: Session, filters: dict, skip: int = 0, limit: int = 100, user_id: Optional[int] = None):
-    query = db.query(Item)
+def _item_sort_keys(sort_by: Optional[str], row_item, rank=None):
+    """Return (order columns, row -> key values, descending) for keyset paging."""
+    if sort_by in ("price_asc", "price_desc"):
+        price = func.coalesce(Item.base_price, 0)
+        return [price, Item.id], lambda row: [row_item(row).base_price or 0, row_item(row).id], sort_by == "price_desc"
+    if sort_by == "newest":
+        return [Item.created_at, Item.id], lambda row: [row_item(row).created_at, row_item(row).id], True
+    if rank is not None:
+        # The rank is selected with the rows (labeled search_rank)
+        return [rank, Item.id], lambda row: [row.search_rank, row_item(row).id], True
+    return [Item.id], lambda row: [row_item(row).id], True
+
+
+def list_items(
+    db: Session,
+    filters: dict,
+    skip: int = 0,
+    limit: int = 100,
+    user_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Item], Optional[str]]:
+    """Return a page of items and the cursor of the next page (or None)."""
+    query = db.query(Item).options(*item_out_options())
 
     # Dynamically add favorite status if user is logged in
     if user_id:
@@ -118,14 +186,17 @@ def list_items(db: Session, filters: dict, skip: int = 0, limit: int = 100, user
         )
 
     # Apply filters from the dictionary
+    rank = None
+    sort_by = filters.get("sort_by")
     if q := filters.get("q"):
-        query = query.filter(
-            or_(
-                Item.name.ilike(f"%{q}%"),
-                Item.description.ilike(f"%{q}%"),
-                Item.brand.ilike(f"%{q}%"),
-            )
-        )
+        search_engine = get_search_engine()
+        query = search_engine.apply(query, q)
+        # Results are ranked by relevance unless an explicit sort is requested
+        if not sort_by:
+            rank = search_engine.rank(q)
+            if rank is not None:
+                rank = rank.label("search_rank")
+                query = query.add_columns(rank)
     if category := filters.get("category"):
         query = query.filter(Item.category.ilike(f"%{category}%"))
     if style := filters.get("style"):
@@ -142,28 +213,32 @@ def list_items(db: Session, filters: dict, skip: int = 0, limit: int = 100, user
     if clothing_type := filters.get("clothing_type"):
         query = query.filter(Item.clothing_type.ilike(f"%{clothing_type}%"))
 
-    # Apply sorting
-    if sort_by := filters.get("sort_by"):
-        if sort_by == "price_asc":
-            query = query.order_by(Item.base_price.asc())
-        elif sort_by == "price_desc":
-            query = query.order_by(Item.base_price.desc())
-        elif sort_by == "newest":
-            query = query.order_by(Item.created_at.desc())
+    # Apply sorting and paginate by cursor (or by offset for old clients)
+    # With extra columns (is_favorite, search_rank) each row is a tuple
+    has_extra_columns = bool(user_id) or rank is not None
+    row_item = (lambda row: row.Item) if has_extra_columns else (lambda row: row)
+    order_columns, row_key, descending = _item_sort_keys(sort_by, row_item, rank)
+    rows, next_cursor = keyset_paginate(
+        query,
+        order_columns,
+        row_key,
+        cursor=cursor,
+        limit=limit,
+        descending=descending,
+        skip=skip,
+    )
 
-    # Paginate and format results
-    paginated_results = query.offset(skip).limit(limit).all()
+    if not has_extra_columns:
+        # Guest without search: the result is just the Item objects
+        return rows, next_cursor
 
-    if user_id:
-        # If user is logged in, result is a tuple (Item, is_favorite)
-        items = []
-        for item, is_favorite in paginated_results:
-            item.is_favorite = is_favorite
-            items.append(item)
-        return items
-    else:
-        # If user is a guest, result is just the Item object
-        return paginated_results
+    items = []
+    for row in rows:
+        item = row.Item
+        if user_id:
+            item.is_favorite = row.is_favorite
+        items.append(item)
+    return items, next_cursor
 
 
 def get_item(db: Session, item_id: int, current_user: Optional[User] = None):
@@ -172,16 +247,7 @@ def get_item(db: Session, item_id: int, current_user: Optional[User] = None):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
 
     if current_user:
-        view = (
-            db.query(UserView)
-            .filter(UserView.user_id == current_user.id, UserView.item_id == item_id)
-            .first()
-        )
-        if view:
-            view.viewed_at = func.now()
-        else:
-            db.add(UserView(user_id=current_user.id, item_id=item_id))
-        db.commit()
+        record_item_view(db, current_user.id, item_id)
     return item
 
 
@@ -194,6 +260,7 @@ def update_item(db: Session, item_id: int, item_in: ItemUpdate):
         setattr(item, key, value)
     db.add(item)
     db.commit()
+    invalidate_tags(ITEMS_TAG)
     db.refresh(item)
     return item
 
@@ -207,50 +274,72 @@ def delete_item(db: Session, item_id: int):
     # which has a CASCADE delete relationship from the Item.
     # The old manual deletion code below was for a previous schema and has been removed.
 
-    # Remove images
+    # Remove images; blobs shared with other images are kept
+    unreferenced = []
     for img in item.images:
-        _remove_upload_file(img.image_url)
+        unreferenced.extend(release_image_blobs(db, img))
         db.delete(img)
+    for variant in item.variants:
+        for img in variant.images:
+            unreferenced.extend(release_image_blobs(db, img))
 
     db.delete(item)
     db.commit()
+    delete_blobs(*unreferenced)
+    invalidate_tags(ITEMS_TAG)
 
 
-def trending_items(db: Session, limit: int = 20):
+async def trending_items(db: AsyncSession, limit: int = 20):
+    ids = await run_in_threadpool(top_ids, TRENDING_ITEMS_KEY, limit)
+    if ids is not None:
+        result = await db.execute(select(Item).options(*item_out_options()).where(Item.id.in_(ids)))
+        items = {item.id: item for item in result.scalars().all()}
+        return [items[i] for i in ids if i in items]
+
+    # Scores have not been computed yet: aggregate live
     sub = (
-        db.query(user_favorite_items.c.item_id, func.count(user_favorite_items.c.user_id).label("likes"))
+        select(user_favorite_items.c.item_id, func.count(user_favorite_items.c.user_id).label("likes"))
         .group_by(user_favorite_items.c.item_id)
         .subquery()
     )
-    query = (
-        db.query(Item)
+    result = await db.execute(
+        select(Item)
+        .options(*item_out_options())
         .join(sub, Item.id == sub.c.item_id)
-        .order_by(desc("likes"))
+        .order_by(desc(sub.c.likes))
         .limit(limit)
     )
-    return query.all()
+    return result.scalars().all()
 
 
-def items_by_collection(db: Session, name: str):
-    return db.query(Item).filter(Item.collection == name).all()
+async def items_by_collection(db: AsyncSession, name: str):
+    result = await db.execute(select(Item).options(*item_out_options()).where(Item.collection == name))
+    return result.scalars().all()
 
 
 def list_favorite_items(db: Session, user: User):
-    return user.favorites.all()
-
-
-def viewed_items(db: Session, user: User, limit: int = 50):
-    views = (
-        db.query(UserView)
-        .filter(UserView.user_id == user.id)
-        .order_by(desc(UserView.viewed_at))
-        .limit(limit)
-        .all()
+    return user.favorites.options(*item_out_options()).all()
+
+
+def viewed_items(
+    db: Session, user: User, limit: int = 50, cursor: Optional[str] = None
+) -> Tuple[List[Item], Optional[str]]:
+    """Return recently viewed items (most recent first) and the next page cursor."""
+    views, next_cursor = keyset_paginate(
+        db.query(UserView).filter(UserView.user_id == user.id),
+        [UserView.viewed_at, UserView.id],
+        lambda view: [view.viewed_at, view.id],
+        cursor=cursor,
+        limit=limit,
     )
     item_ids = [v.item_id for v in views]
     if not item_ids:
-        return []
-    return db.query(Item).filter(Item.id.in_(item_ids)).all()
+        return [], None
+    items = {
+        item.id: item
+        for item in db.query(Item).options(*item_out_options()).filter(Item.id.in_(item_ids)).all()
+    }
+    return [items[i] for i in item_ids if i in items], next_cursor
 
 
 def clear_view_history(db: Session, user: User):
@@ -258,18 +347,19 @@ def clear_view_history(db: Session, user: User):
     db.commit()
 
 
-def similar_items(db: Session, item_id: int, limit: int = 10):
-    target = db.get(Item, item_id)
+async def similar_items(db: AsyncSession, item_id: int, limit: int = 10):
+    target = await db.get(Item, item_id)
     if not target:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
 
-    query = db.query(Item).filter(Item.id != item_id)
+    query = select(Item).options(*item_out_options()).where(Item.id != item_id)
     if target.category:
-        query = query.filter(Item.category == target.category)
+        query = query.where(Item.category == target.category)
     if target.style:
-        query = query.filter(Item.style == target.style)
+        query = query.where(Item.style == target.style)
 
-    return query.limit(limit).all()
+    result = await db.execute(query.limit(limit))
+    return result.scalars().all()
 
 
 def toggle_favorite_item(db: Session, user: User, item_id: int):
@@ -353,6 +443,7 @@ def create_variant(db: Session, item_id: int, payload: VariantCreate):
     variant = ItemVariant(**payload.dict(), item_id=item_id)
     db.add(variant)
     db.commit()
+    invalidate_tags(ITEMS_TAG)
     db.refresh(variant)
     return variant
 
@@ -368,6 +459,7 @@ def update_variant(db: Session, variant_id: int, payload: VariantUpdate):
         
     db.add(variant)
     db.commit()
+    invalidate_tags(ITEMS_TAG)
     db.refresh(variant)
     return variant
 
@@ -376,5 +468,10 @@ def delete_variant(db: Session, variant_id: int):
     variant = db.get(ItemVariant, variant_id)
     if not variant:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Variant not found")
+    unreferenced = []
+    for img in variant.images:
+        unreferenced.extend(release_image_blobs(db, img))
     db.delete(variant)
-    db.commit() 
\ No newline at end of file
+    db.commit()
+    delete_blobs(*unreferenced)
+    invalidate_tags(ITEMS_TAG) 
\ No newline at end of file
@@ -1,17 +1,33 @@
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func, case
+from sqlalchemy import and_, func, case, tuple_
 from datetime import datetime
 
 from app.db.models import Item, ItemVariant, ItemImage, VariantImage, User, Comment
 from app.api.v1.endpoints.items.schemas import ItemCreate, ItemUpdate, VariantCreate, VariantUpdate
+from app.core.cache import ITEMS_TAG, cache_get, cache_set, invalidate_tags, make_key
+from app.core.config import get_settings
 from app.core.exceptions import NotFoundException, ValidationException, ConflictException
 from app.core.utils import generate_slug, generate_sku
+from app.db.loaders import item_out_options
+from app.core.search import get_search_engine
+from app.core.pagination import keyset_paginate
+from app.core.storage import acquire_blob, key_from_url
+from app.tasks.image_tasks import enqueue_image_variants
 
 
 class ItemServiceV2:
     """Улучшенный сервис для работы с товарами."""
     
+    # Допустимые ключи сортировки: выражение и значение для курсора.
+    # Ключ не должен быть NULL, иначе сравнение кортежей в keyset-условии
+    # даёт NULL и строки выпадают со следующих страниц.
+    SORT_FIELDS = {
+        "created_at": (Item.created_at, lambda item: item.created_at),
+        "name": (Item.name, lambda item: item.name),
+        "base_price": (func.coalesce(Item.base_price, 0), lambda item: item.base_price or 0),
+    }
+    
     @staticmethod
     def get_items(
         db: Session,
@@ -27,15 +43,23 @@ class ItemServiceV2:
         size: Optional[str] = None,
         in_stock: Optional[bool] = None,
         search: Optional[str] = None,
-        sort_by: Optional[str] = "created_at",
-        sort_order: str = "desc"
+        sort_by: Optional[str] = None,
+        sort_order: str = "desc",
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Получить список товаров с расширенной фильтрацией."""
-        query = db.query(Item).options(
-            joinedload(Item.variants),
-            joinedload(Item.images),
-            joinedload(Item.comments)
-        )
+        """Получить список товаров с расширенной фильтрацией.
+
+        Страница выбирается по строкам `items` без JOIN коллекций, а варианты и
+        изображения догружаются пакетно (selectin) только для товаров страницы.
+        Комментарии в списке не загружаются.
+        """
+        if sort_by and sort_by not in ItemServiceV2.SORT_FIELDS:
+            raise ValidationException(
+                f"Недопустимое поле сортировки: {sort_by}. "
+                f"Доступны: {', '.join(ItemServiceV2.SORT_FIELDS)}"
+            )
+
+        query = db.query(Item)
         
         # Базовый фильтр - только активные товары
         query = query.filter(Item.is_active == True)
@@ -89,34 +113,48 @@ class ItemServiceV2:
                 variant_filters.append(ItemVariant.stock > ItemVariant.reserved_stock)
             
             if variant_filters:
-                query = query.join(ItemVariant).filter(and_(*variant_filters))
-                query = query.distinct()
+                # EXISTS вместо JOIN: одна строка на товар, DISTINCT не нужен
+                query = query.filter(Item.variants.any(and_(*variant_filters)))
         
         # Поиск по тексту
+        search_engine = get_search_engine()
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                or_(
-                    Item.name.ilike(search_term),
-                    Item.description.ilike(search_term),
-                    Item.brand.ilike(search_term),
-                    Item.article.ilike(search_term),
-                    Item.tags.contains([search])
-                )
-            )
+            query = search_engine.apply(query, search)
         
         # Подсчет общего количества
         total = query.count()
         
-        # Сортировка
-        order_column = getattr(Item, sort_by, Item.created_at)
-        if sort_order == "asc":
-            query = query.order_by(order_column.asc())
+        # Сортировка: по релевантности, если задан поиск и не указано поле
+        rank = search_engine.rank(search) if search and not sort_by else None
+        if rank is not None:
+            # Релевантность выбирается вместе со строками и попадает в курсор
+            rank = rank.label("search_rank")
+            query = query.add_columns(rank)
+            order_columns = [rank, Item.id]
+            descending = True
+
+            def row_key(row):
+                return [row.search_rank, row.Item.id]
         else:
-            query = query.order_by(order_column.desc())
-        
-        # Пагинация
-        items = query.offset(skip).limit(limit).all()
+            sort_column, sort_value = ItemServiceV2.SORT_FIELDS[sort_by or "created_at"]
+            order_columns = [sort_column, Item.id]
+            descending = sort_order != "asc"
+
+            def row_key(item):
+                return [sort_value(item), item.id]
+        
+        # Пагинация: по курсору, либо по смещению для старых клиентов
+        items, next_cursor = keyset_paginate(
+            query.options(*item_out_options()),
+            order_columns,
+            row_key,
+            cursor=cursor,
+            limit=limit,
+            descending=descending,
+            skip=skip,
+        )
+        if rank is not None:
+            items = [row.Item for row in items]
         
         # Агрегация для фильтров
         aggregations = ItemServiceV2._get_aggregations(db, base_filters={
@@ -130,6 +168,7 @@ class ItemServiceV2:
             "total": total,
             "skip": skip,
             "limit": limit,
+            "next_cursor": next_cursor,
             "aggregations": aggregations
         }
     
@@ -184,6 +223,7 @@ class ItemServiceV2:
                 variant = ItemServiceV2._create_variant(db, item.id, variant_data)
         
         # Добавление изображений
+        new_images = []
         if item_data.images:
             for idx, image_data in enumerate(item_data.images):
                 image = ItemImage(
@@ -195,8 +235,14 @@ class ItemServiceV2:
                     is_primary=(idx == 0)
                 )
                 db.add(image)
+                new_images.append(image)
+                blob_key = key_from_url(image_data.url)
+                if blob_key:
+                    acquire_blob(db, blob_key)
         
         db.commit()
+        invalidate_tags(ITEMS_TAG)
+        enqueue_image_variants("item", [image.id for image in new_images if not image.thumbnail_url])
         db.refresh(item)
         
         return item
@@ -235,6 +281,7 @@ class ItemServiceV2:
             setattr(item, key, value)
         
         db.commit()
+        invalidate_tags(ITEMS_TAG)
         db.refresh(item)
         
         return item
@@ -256,6 +303,7 @@ class ItemServiceV2:
         )
         
         db.commit()
+        invalidate_tags(ITEMS_TAG)
         
         return True
     
@@ -302,6 +350,7 @@ class ItemServiceV2:
             setattr(variant, key, value)
         
         db.commit()
+        invalidate_tags(ITEMS_TAG)
         db.refresh(variant)
         
         return variant
@@ -356,6 +405,7 @@ class ItemServiceV2:
         db.flush()
         
         # Добавление изображений варианта
+        new_images = []
         if hasattr(variant_data, "images") and variant_data.images:
             for idx, image_data in enumerate(variant_data.images):
                 image = VariantImage(
@@ -366,89 +416,85 @@ class ItemServiceV2:
                     order=idx
                 )
                 db.add(image)
+                new_images.append(image)
+                blob_key = key_from_url(image_data.url)
+                if blob_key:
+                    acquire_blob(db, blob_key)
         
         db.commit()
+        invalidate_tags(ITEMS_TAG)
+        enqueue_image_variants("variant", [image.id for image in new_images if not image.thumbnail_url])
         db.refresh(variant)
         
         return variant
     
     @staticmethod
     def _get_aggregations(db: Session, base_filters: Dict[str, Any]) -> Dict[str, Any]:
-        """Получить агрегации для фильтров."""
-        # Базовый запрос с фильтрами
-        base_query = db.query(Item)
-        for key, value in base_filters.items():
-            if value is not None:
-                base_query = base_query.filter(getattr(Item, key) == value)
-        
-        # Агрегация по брендам
-        brands = db.query(
-            Item.brand,
-            func.count(Item.id).label("count")
-        ).filter(
-            Item.brand.isnot(None)
-        ).group_by(Item.brand).all()
+        """Получить агрегации для фильтров (из кэша, либо одним запросом)."""
+        active_filters = {k: v for k, v in base_filters.items() if v is not None}
+        key = make_key("facets", active_filters, tags=[ITEMS_TAG])
+        cached = cache_get(key)
+        if cached is not None:
+            return cached
+        
+        aggregations = ItemServiceV2._compute_aggregations(db, active_filters)
+        cache_set(key, aggregations, get_settings().FACETS_CACHE_TTL)
+        return aggregations
+    
+    @staticmethod
+    def _compute_aggregations(db: Session, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Все фасеты одним запросом через GROUPING SETS."""
+        actual_price = case(
+            (ItemVariant.discount_price.isnot(None), ItemVariant.discount_price),
+            else_=ItemVariant.price
+        )
+        # Битовая маска GROUPING(): 0 — колонка участвует в группировке
+        grouping = func.grouping(Item.brand, Item.style, ItemVariant.color, ItemVariant.size)
         
-        # Агрегация по стилям
-        styles = db.query(
+        query = db.query(
+            grouping.label("grouping"),
+            Item.brand,
             Item.style,
-            func.count(Item.id).label("count")
-        ).filter(
-            Item.style.isnot(None)
-        ).group_by(Item.style).all()
-        
-        # Агрегация по цветам через варианты
-        colors = db.query(
             ItemVariant.color,
-            func.count(func.distinct(ItemVariant.item_id)).label("count")
-        ).join(Item).filter(
-            and_(
-                ItemVariant.color.isnot(None),
-                ItemVariant.is_active == True,
-                Item.is_active == True
-            )
-        ).group_by(ItemVariant.color).all()
-        
-        # Агрегация по размерам через варианты
-        sizes = db.query(
             ItemVariant.size,
-            func.count(func.distinct(ItemVariant.item_id)).label("count")
-        ).join(Item).filter(
-            and_(
-                ItemVariant.size.isnot(None),
-                ItemVariant.is_active == True,
-                Item.is_active == True
-            )
-        ).group_by(ItemVariant.size).all()
-        
-        # Диапазон цен
-        price_range = db.query(
-            func.min(
-                case(
-                    (ItemVariant.discount_price.isnot(None), ItemVariant.discount_price),
-                    else_=ItemVariant.price
-                )
-            ).label('min_price'),
-            func.max(
-                case(
-                    (ItemVariant.discount_price.isnot(None), ItemVariant.discount_price),
-                    else_=ItemVariant.price
-                )
-            ).label('max_price')
-        ).join(Item).filter(
-            and_(
-                ItemVariant.is_active == True,
-                Item.is_active == True
+            func.count(func.distinct(Item.id)).label("count"),
+            func.min(actual_price).label("min_price"),
+            func.max(actual_price).label("max_price"),
+        ).outerjoin(
+            ItemVariant,
+            and_(ItemVariant.item_id == Item.id, ItemVariant.is_active == True)
+        )
+        for key, value in filters.items():
+            query = query.filter(getattr(Item, key) == value)
+        
+        rows = query.group_by(
+            func.grouping_sets(
+                tuple_(Item.brand),
+                tuple_(Item.style),
+                tuple_(ItemVariant.color),
+                tuple_(ItemVariant.size),
+                tuple_(),
             )
-        ).first()
+        ).all()
+        
+        brands, styles, colors, sizes = [], [], [], []
+        price_range = {"min": 0, "max": 0}
+        for row in rows:
+            if row.grouping == 0b0111 and row.brand is not None:
+                brands.append({"value": row.brand, "count": row.count})
+            elif row.grouping == 0b1011 and row.style is not None:
+                styles.append({"value": row.style, "count": row.count})
+            elif row.grouping == 0b1101 and row.color is not None:
+                colors.append({"value": row.color, "count": row.count})
+            elif row.grouping == 0b1110 and row.size is not None:
+                sizes.append({"value": row.size, "count": row.count})
+            elif row.grouping == 0b1111:
+                price_range = {"min": row.min_price or 0, "max": row.max_price or 0}
         
         return {
-            "brands": [{"value": b[0], "count": b[1]} for b in brands],
-            "styles": [{"value": s[0], "count": s[1]} for s in styles],
-            "colors": [{"value": c[0], "count": c[1]} for c in colors],
-            "sizes": [{"value": s[0], "count": s[1]} for s in sizes],
-            "price_range": {
-                "min": price_range.min_price if price_range else 0,
-                "max": price_range.max_price if price_range else 0
-            }
-        } 
\ No newline at end of file
+            "brands": brands,
+            "styles": styles,
+            "colors": colors,
+            "sizes": sizes,
+            "price_range": price_range
+        }
@@ -1,8 +1,9 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, status, Query
+from fastapi import APIRouter, Depends, status, Query, Response
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.core.pagination import NEXT_CURSOR_HEADER
 from app.core.security import get_current_user, get_current_user_optional
 from app.db.models.user import User
 from . import service
@@ -18,6 +19,7 @@ def create_outfit(outfit_in: OutfitCreate, db: Session = Depends(get_db), user:
 
 @router.get("/", response_model=List[OutfitOut])
 def list_outfits(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     q: Optional[str] = Query(None),
@@ -26,10 +28,16 @@ def list_outfits(
     max_price: Optional[float] = Query(None),
     collection: Optional[str] = Query(None),
     sort_by: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db),
     user: Optional[User] = Depends(get_current_user_optional)
 ):
-    return service.list_outfits(db, user, skip, limit, q, style, min_price, max_price, collection, sort_by)
+    outfits, next_cursor = service.list_outfits(
+        db, user, skip, limit, q, style, min_price, max_price, collection, sort_by, cursor
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return outfits
 
 
 @router.get("/favorites", response_model=List[OutfitOut])
@@ -38,8 +46,17 @@ def list_favorite_outfits(db: Session = Depends(get_db), user: User = Depends(ge
 
 
 @router.get("/history", response_model=List[OutfitOut])
-def viewed_outfits(limit: int = 50, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    return service.viewed_outfits(db, user, limit)
+def viewed_outfits(
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    user: User = Depends(get_current_user),
+):
+    outfits, next_cursor = service.viewed_outfits(db, user, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return outfits
 
 
 @router.delete("/history", status_code=status.HTTP_204_NO_CONTENT)
@@ -48,7 +65,7 @@ def clear_outfit_view_history(db: Session = Depends(get_db), user: User = Depend
 
 
 @router.get("/trending", response_model=List[OutfitOut])
-def trending_outfits(limit: int = 20, db: Session = Depends(get_db)):
+def trending_outfits(limit: int = 20, db: Session = Depends(get_read_db)):
     return service.trending_outfits(db, limit)
 
 
@@ -83,7 +100,7 @@ def add_outfit_comment(outfit_id: int, payload: OutfitCommentCreate, db: Session
 
 
 @router.get("/{outfit_id}/comments", response_model=List[OutfitCommentOut])
-def list_outfit_comments(outfit_id: int, db: Session = Depends(get_db)):
+def list_outfit_comments(outfit_id: int, db: Session = Depends(get_read_db)):
     return service.list_outfit_comments(db, outfit_id)
 
 
@@ -104,10 +104,12 @@ class OutfitImageResponse(BaseModel):
     id: int
     image_url: str
     thumbnail_url: Optional[str]
+    variants: Optional[Dict[str, Dict[str, str]]] = None
     alt_text: Optional[str]
     order: int
-    
-    model_config = ConfigDict(from_attributes=True)
+
+    class Config:
+        orm_mode = True
 
 
 class UserInfo(BaseModel):
@@ -202,6 +204,7 @@ class OutfitOut(BaseModel):
     updated_at: Optional[datetime]
     collection: Optional[str]
     items: Dict[str, List[Any]]
+    images: List[OutfitImageResponse] = []
     total_price: float
     
     model_config = ConfigDict(from_attributes=True)
@@ -1,16 +1,21 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from fastapi import HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import or_, and_, func, desc
 from datetime import datetime, timedelta
 
 from app.db.models.outfit import Outfit, OutfitItem
 from app.db.models.item import Item
+from app.core.cache import OUTFITS_TAG, invalidate_tags
+from app.core.pagination import keyset_paginate
 from app.core.security import is_admin
+from app.core.storage import delete_blobs, release_image_blobs
+from app.core.trending import TRENDING_OUTFITS_KEY, top_ids
+from app.core.view_events import record_outfit_view
 from app.db.models.user import User
 from app.db.models.associations import user_favorite_outfits, OutfitView
 from app.db.models.comment import Comment
-from .schemas import OutfitCreate, OutfitUpdate, OutfitOut, OutfitCommentCreate, OutfitCommentOut, OutfitItemBase
+from .schemas import OutfitCreate, OutfitUpdate, OutfitOut, OutfitImageResponse, OutfitCommentCreate, OutfitCommentOut, OutfitItemBase
 
 CATEGORY_MAP = {
     # payload_field: (set_of_acceptable_item_categories, item_category_for_outfit_item)
@@ -65,6 +70,7 @@ def _calculate_outfit_price(outfit: Outfit) -> OutfitOut:
         footwear=categorized_items.get("footwear", []),
         accessories=categorized_items.get("accessories", []),
         fragrances=categorized_items.get("fragrances", []),
+        images=[OutfitImageResponse.from_orm(image) for image in outfit.images],
         total_price=total_price,
     )
 
@@ -116,6 +122,7 @@ def create_outfit(db: Session, user: User, outfit_in: OutfitCreate):
 
     db.add(db_outfit)
     db.commit()
+    invalidate_tags(OUTFITS_TAG)
     db.refresh(db_outfit)
     return _calculate_outfit_price(db_outfit)
 
@@ -131,8 +138,14 @@ def list_outfits(
     max_price: Optional[float] = None,
     collection: Optional[str] = None,
     sort_by: Optional[str] = None,
-):
-    query = db.query(Outfit)
+    cursor: Optional[str] = None,
+) -> Tuple[List[OutfitOut], Optional[str]]:
+    """Return a page of outfits and the cursor of the next page (or None).
+
+    Price filters and price sorting are applied to the fetched page only,
+    since the total price is computed from the outfit items.
+    """
+    query = db.query(Outfit).options(selectinload(Outfit.images))
 
     if user is not None and not is_admin(user):
         query = query.filter(Outfit.owner_id == str(user.id))
@@ -154,9 +167,13 @@ def list_outfits(
         query = query.filter(Outfit.collection == collection)
 
     if sort_by == "newest":
-        query = query.order_by(Outfit.created_at.desc())
+        order_columns = [Outfit.created_at, Outfit.id]
+        row_key = lambda outfit: [outfit.created_at, outfit.id]
+    else:
+        order_columns = [Outfit.id]
+        row_key = lambda outfit: [outfit.id]
 
-    outfits = query.offset(skip).limit(limit).all()
+    outfits, next_cursor = keyset_paginate(query, order_columns, row_key, cursor=cursor, limit=limit, skip=skip)
     result = []
 
     for outfit in outfits:
@@ -167,26 +184,32 @@ def list_outfits(
     if sort_by in ["price_asc", "price_desc"]:
         result.sort(key=lambda x: x.total_price or 0, reverse=(sort_by == "price_desc"))
 
-    return result
+    return result, next_cursor
 
 
 def list_favorite_outfits(db: Session, user: User):
-    return [_calculate_outfit_price(o) for o in user.favorite_outfits.all()]
+    outfits = user.favorite_outfits.options(selectinload(Outfit.images)).all()
+    return [_calculate_outfit_price(o) for o in outfits]
 
 
-def viewed_outfits(db: Session, user: User, limit: int = 50):
-    views = (
-        db.query(OutfitView)
-        .filter(OutfitView.user_id == user.id)
-        .order_by(OutfitView.viewed_at.desc())
-        .limit(limit)
-        .all()
+def viewed_outfits(
+    db: Session, user: User, limit: int = 50, cursor: Optional[str] = None
+) -> Tuple[List[OutfitOut], Optional[str]]:
+    views, next_cursor = keyset_paginate(
+        db.query(OutfitView).filter(OutfitView.user_id == user.id),
+        [OutfitView.viewed_at, OutfitView.id],
+        lambda view: [view.viewed_at, view.id],
+        cursor=cursor,
+        limit=limit,
     )
     outfit_ids = [v.outfit_id for v in views]
     if not outfit_ids:
-        return []
-    outfits = db.query(Outfit).filter(Outfit.id.in_(outfit_ids)).all()
-    return [_calculate_outfit_price(o) for o in outfits]
+        return [], None
+    outfits = {
+        o.id: o
+        for o in db.query(Outfit).options(selectinload(Outfit.images)).filter(Outfit.id.in_(outfit_ids)).all()
+    }
+    return [_calculate_outfit_price(outfits[i]) for i in outfit_ids if i in outfits], next_cursor
 
 
 def clear_outfit_view_history(db: Session, user: User):
@@ -200,8 +223,7 @@ def get_outfit(db: Session, outfit_id: int, user: Optional[User]):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Outfit not found")
 
     if user:
-        db.add(OutfitView(user_id=user.id, outfit_id=outfit.id))
-        db.commit()
+        record_outfit_view(db, user.id, outfit.id)
 
     return _calculate_outfit_price(outfit)
 
@@ -243,6 +265,7 @@ def update_outfit(db: Session, user: User, outfit_id: int, outfit_in: OutfitUpda
 
     db.add(outfit)
     db.commit()
+    invalidate_tags(OUTFITS_TAG)
     db.refresh(outfit)
     return _calculate_outfit_price(outfit)
 
@@ -252,14 +275,30 @@ def delete_outfit(db: Session, user: User, outfit_id: int):
     if not outfit:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Outfit not found")
     _check_owner_or_admin(outfit, user)
+    # Изображения удаляются каскадом; blob'ы, общие с другими изображениями, остаются
+    unreferenced = []
+    for image in outfit.images:
+        unreferenced.extend(release_image_blobs(db, image))
     db.delete(outfit)
     db.commit()
+    delete_blobs(*unreferenced)
+    invalidate_tags(OUTFITS_TAG)
 
 
 def trending_outfits(db: Session, limit: int = 20):
+    ids = top_ids(TRENDING_OUTFITS_KEY, limit)
+    if ids is not None:
+        outfits = {
+            o.id: o
+            for o in db.query(Outfit).options(selectinload(Outfit.images)).filter(Outfit.id.in_(ids)).all()
+        }
+        return [_calculate_outfit_price(outfits[i]) for i in ids if i in outfits]
+
+    # Scores have not been computed yet: aggregate live
     seven_days_ago = datetime.utcnow() - timedelta(days=7)
     results = (
         db.query(Outfit, func.count(OutfitView.id).label("view_count"))
+        .options(selectinload(Outfit.images))
         .join(OutfitView, Outfit.id == OutfitView.outfit_id)
         .filter(OutfitView.viewed_at >= seven_days_ago)
         .group_by(Outfit.id)
@@ -1,6 +1,7 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.core.security import invalidate_user_cache
 from app.db.models.user import User
 from app.db.models.outfit import Outfit
 from .schemas import ProfileUpdate
@@ -68,6 +69,7 @@ def update_profile(db: Session, user: User, profile_in: ProfileUpdate):
     db.add(user)
     db.commit()
     db.refresh(user)
+    invalidate_user_cache(user.id)
 
     return user
 
@@ -77,7 +79,9 @@ def delete_profile(db: Session, user: User):
     # Cascading deletes are configured on the User model relationships,
     # so deleting the user will correctly remove all their associated data
     # like outfits, cart items, favorites, etc.
+    user_id = user.id
     db.delete(user)
     db.commit()
+    invalidate_user_cache(user_id)
 
     return None 
\ No newline at end of file
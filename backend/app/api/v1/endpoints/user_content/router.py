@@ -1,9 +1,9 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.security import get_current_user
 from app.db.models.user import User
 from app.api.v1.endpoints.items.schemas import ItemOut
@@ -16,7 +16,7 @@ router = APIRouter(prefix="/users", tags=["UserContent"], dependencies=[Depends(
 async def toggle_favorite(
     user_id: int,
     item_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current: User = Depends(get_current_user),
 ):
     return await service.toggle_favorite(db, user_id, item_id, current)
@@ -25,7 +25,7 @@ async def toggle_favorite(
 @router.get("/{user_id}/favorites", response_model=List[ItemOut])
 async def list_favorites(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current: User = Depends(get_current_user),
 ):
     return await service.list_favorites(db, user_id, current)
@@ -35,7 +35,7 @@ async def list_favorites(
 async def user_history(
     user_id: int,
     limit: int = 50,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current: User = Depends(get_current_user),
 ):
     return await service.user_history(db, user_id, limit, current) 
\ No newline at end of file
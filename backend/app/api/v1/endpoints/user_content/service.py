@@ -1,10 +1,11 @@
 from typing import List
 
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import is_admin
+from app.db.loaders import item_out_options
 from app.db.models.user import User
 from app.db.models.item import Item
 from app.db.models.associations import user_favorite_items, UserView
@@ -15,49 +16,60 @@ def _check_access(target_user_id: int, current: User):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
 
-async def toggle_favorite(db: Session, user_id: int, item_id: int, current_user: User):
+async def toggle_favorite(db: AsyncSession, user_id: int, item_id: int, current_user: User):
     _check_access(user_id, current_user)
 
-    item = db.get(Item, item_id)
+    item = await db.get(Item, item_id)
     if not item:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
 
-    association_exists = db.query(user_favorite_items).filter(
-        user_favorite_items.c.user_id == user_id,
-        user_favorite_items.c.item_id == item_id,
+    association_exists = (
+        await db.execute(
+            select(user_favorite_items.c.item_id).where(
+                user_favorite_items.c.user_id == user_id,
+                user_favorite_items.c.item_id == item_id,
+            )
+        )
     ).first()
 
     if association_exists:
-        db.execute(
-            user_favorite_items.delete().where(
+        await db.execute(
+            delete(user_favorite_items).where(
                 user_favorite_items.c.user_id == user_id,
                 user_favorite_items.c.item_id == item_id,
             )
         )
-        db.commit()
+        await db.commit()
         return {"detail": "Removed from favorites"}
     else:
-        db.execute(user_favorite_items.insert().values(user_id=user_id, item_id=item_id))
-        db.commit()
+        await db.execute(insert(user_favorite_items).values(user_id=user_id, item_id=item_id))
+        await db.commit()
         return {"detail": "Added to favorites"}
 
 
-async def list_favorites(db: Session, user_id: int, current_user: User) -> List[Item]:
+async def list_favorites(db: AsyncSession, user_id: int, current_user: User) -> List[Item]:
     _check_access(user_id, current_user)
-    user = db.get(User, user_id)
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return user.favorites.all()
+    result = await db.execute(
+        select(Item)
+        .options(*item_out_options())
+        .join(user_favorite_items, user_favorite_items.c.item_id == Item.id)
+        .where(user_favorite_items.c.user_id == user_id)
+    )
+    return result.scalars().all()
 
 
-async def user_history(db: Session, user_id: int, limit: int, current_user: User) -> List[Item]:
+async def user_history(db: AsyncSession, user_id: int, limit: int, current_user: User) -> List[Item]:
     _check_access(user_id, current_user)
 
     sub = (
-        db.query(UserView.item_id)
-        .filter(UserView.user_id == user_id)
+        select(UserView.item_id)
+        .where(UserView.user_id == user_id)
         .order_by(desc(UserView.viewed_at))
         .limit(limit)
         .subquery()
     )
-    return db.query(Item).join(sub, Item.id == sub.c.item_id).all() 
\ No newline at end of file
+    result = await db.execute(select(Item).options(*item_out_options()).join(sub, Item.id == sub.c.item_id))
+    return result.scalars().all()
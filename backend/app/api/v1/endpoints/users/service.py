@@ -2,7 +2,7 @@ from typing import List, Optional
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash, invalidate_user_cache
 from app.db.models.user import User
 from app.db.models.outfit import Outfit
 from .schemas import UserCreateAdmin, UserUpdateAdmin
@@ -26,6 +26,7 @@ def delete_user(db: Session, user_id: int):
     # cart items, comments, etc., thanks to `cascade="all, delete-orphan"`.
     db.delete(user)
     db.commit()
+    invalidate_user_cache(user_id)
 
 
 def list_user_outfits(db: Session, user_id: int):
@@ -74,4 +75,5 @@ def update_user_admin(db: Session, user_id: int, body: UserUpdateAdmin) -> User:
     db.add(user)
     db.commit()
     db.refresh(user)
+    invalidate_user_cache(user.id)
     return user 
\ No newline at end of file
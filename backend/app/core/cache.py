@@ -0,0 +1,74 @@
+"""Кэш в Redis с инвалидацией по тегам.
+
+Каждый тег (например, "items") имеет счётчик версии. Версии тегов входят в
+ключ записи, поэтому `invalidate_tags` — это один INCR, после которого все
+старые записи перестают читаться и доживают до своего TTL.
+Ошибки Redis не ломают запрос: кэш просто пропускается.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any, Iterable, Optional
+
+from redis.exceptions import RedisError
+
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+TAG_VERSION_PREFIX = "cache:tag:"
+
+# Теги данных каталога
+ITEMS_TAG = "items"  # товары и их варианты
+OUTFITS_TAG = "outfits"
+
+
+def _tag_versions(tags: Iterable[str]) -> list:
+    tags = list(tags)
+    if not tags:
+        return []
+    versions = get_redis().mget([f"{TAG_VERSION_PREFIX}{tag}" for tag in tags])
+    return [f"{tag}.{version or 0}" for tag, version in zip(tags, versions)]
+
+
+def make_key(prefix: str, params: Any, tags: Iterable[str] = ()) -> Optional[str]:
+    """Ключ записи: префикс, версии тегов и хэш параметров. None, если Redis недоступен."""
+    try:
+        versions = _tag_versions(tags)
+    except RedisError:
+        logger.warning("Cache unavailable, skipping", exc_info=True)
+        return None
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return ":".join(["cache", prefix, *versions, digest])
+
+
+def cache_get(key: Optional[str]) -> Optional[Any]:
+    if key is None:
+        return None
+    try:
+        raw = get_redis().get(key)
+    except RedisError:
+        logger.warning("Cache read failed", exc_info=True)
+        return None
+    return json.loads(raw) if raw is not None else None
+
+
+def cache_set(key: Optional[str], value: Any, ttl: int) -> None:
+    if key is None:
+        return
+    try:
+        get_redis().setex(key, ttl, json.dumps(value, default=str))
+    except RedisError:
+        logger.warning("Cache write failed", exc_info=True)
+
+
+def invalidate_tags(*tags: str) -> None:
+    """Сделать недействительными все записи с указанными тегами."""
+    try:
+        pipe = get_redis().pipeline()
+        for tag in tags:
+            pipe.incr(f"{TAG_VERSION_PREFIX}{tag}")
+        pipe.execute()
+    except RedisError:
+        logger.warning("Cache invalidation failed for %s", tags, exc_info=True)
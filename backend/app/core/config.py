@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseSettings, Field, validator
 
@@ -10,6 +10,35 @@ class Settings(BaseSettings):
     BACKEND_CORS_ORIGINS: List[str] = ["*"]
 
     DATABASE_URL: str = Field("postgresql://postgres:postgres@db:5432/trcapp", env="DATABASE_URL")
+    # Defaults to DATABASE_URL with the asyncpg driver
+    ASYNC_DATABASE_URL: str = Field("", env="ASYNC_DATABASE_URL")
+
+    # Per-process pool settings: total connections = workers * (size + overflow)
+    DB_POOL_SIZE: int = Field(5, env="DB_POOL_SIZE")
+    DB_MAX_OVERFLOW: int = Field(10, env="DB_MAX_OVERFLOW")
+    DB_POOL_TIMEOUT: float = Field(30.0, env="DB_POOL_TIMEOUT")
+    DB_POOL_RECYCLE: int = Field(1800, env="DB_POOL_RECYCLE")
+    # True: ping on every checkout; False: rely on pool_recycle and reconnect on error
+    DB_POOL_PRE_PING: bool = Field(True, env="DB_POOL_PRE_PING")
+
+    # Streaming replica for read-only routes (empty: everything goes to the primary)
+    DATABASE_REPLICA_URL: str = Field("", env="DATABASE_REPLICA_URL")
+    REPLICA_MAX_LAG_SECONDS: float = Field(5.0, env="REPLICA_MAX_LAG_SECONDS")
+    REPLICA_LAG_CHECK_SECONDS: float = Field(2.0, env="REPLICA_LAG_CHECK_SECONDS")
+    # production: gunicorn + uvicorn workers | development: single uvicorn with --reload
+    SERVER_MODE: str = Field("production", env="SERVER_MODE")
+    SERVER_HOST: str = Field("0.0.0.0", env="SERVER_HOST")
+    SERVER_PORT: int = Field(8000, env="SERVER_PORT")
+    # 0: derived from the CPUs available to the container
+    WEB_CONCURRENCY: int = Field(0, env="WEB_CONCURRENCY")
+    # Keep above the proxy's upstream keepalive_timeout so nginx never reuses a closed socket
+    SERVER_KEEPALIVE_SECONDS: int = Field(75, env="SERVER_KEEPALIVE_SECONDS")
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = Field(30, env="SERVER_GRACEFUL_TIMEOUT_SECONDS")
+    SERVER_TIMEOUT_SECONDS: int = Field(60, env="SERVER_TIMEOUT_SECONDS")
+    # Recycle workers after N requests (0: never), with jitter so they don't restart together
+    SERVER_MAX_REQUESTS: int = Field(10000, env="SERVER_MAX_REQUESTS")
+    SERVER_MAX_REQUESTS_JITTER: int = Field(1000, env="SERVER_MAX_REQUESTS_JITTER")
+
     REDIS_URL: str = Field("redis://redis:6379/0", env="REDIS_URL")
 
     CELERY_BROKER_URL: str = Field("amqp://rabbitmq:5672//", env="CELERY_BROKER_URL")
@@ -23,10 +52,48 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(60, env="ACCESS_TOKEN_EXPIRE_MINUTES")
     REFRESH_TOKEN_EXPIRE_DAYS: int = Field(14, env="REFRESH_TOKEN_EXPIRE_DAYS")
 
+    # bcrypt cost and the bounded pool that runs hashing off the request threads
+    BCRYPT_ROUNDS: int = Field(12, env="BCRYPT_ROUNDS")
+    PASSWORD_HASH_WORKERS: int = Field(4, env="PASSWORD_HASH_WORKERS")
+    PASSWORD_HASH_MAX_PENDING: int = Field(16, env="PASSWORD_HASH_MAX_PENDING")
+
+    # In-process cache of verified access tokens and the revoked-token bloom filter
+    AUTH_CACHE_TTL_SECONDS: float = Field(30.0, env="AUTH_CACHE_TTL_SECONDS")
+    AUTH_CACHE_MAX_SIZE: int = Field(10000, env="AUTH_CACHE_MAX_SIZE")
+    REVOCATION_BLOOM_CAPACITY: int = Field(100000, env="REVOCATION_BLOOM_CAPACITY")
+    REVOCATION_BLOOM_ERROR_RATE: float = Field(0.001, env="REVOCATION_BLOOM_ERROR_RATE")
+    REVOCATION_BLOOM_REBUILD_SECONDS: int = Field(600, env="REVOCATION_BLOOM_REBUILD_SECONDS")
+
     GOOGLE_CLIENT_ID: str = Field("", env="GOOGLE_CLIENT_ID")
     GOOGLE_CLIENT_SECRET: str = Field("", env="GOOGLE_CLIENT_SECRET")
     GOOGLE_REDIRECT_URI: str = Field("http://localhost:8000/api/auth/google/callback", env="GOOGLE_REDIRECT_URI")
 
+    # postgres (tsvector + GIN) | ilike (fallback without the search index)
+    SEARCH_BACKEND: str = Field("postgres", env="SEARCH_BACKEND")
+
+    FACETS_CACHE_TTL: int = Field(300, env="FACETS_CACHE_TTL")
+    RESPONSE_CACHE_ENABLED: bool = Field(True, env="RESPONSE_CACHE_ENABLED")
+
+    MAX_UPLOAD_SIZE_MB: int = Field(10, env="MAX_UPLOAD_SIZE_MB")
+    # local (каталог UPLOAD_ROOT) | s3 (S3-совместимое хранилище, например MinIO)
+    STORAGE_BACKEND: str = Field("local", env="STORAGE_BACKEND")
+    UPLOAD_ROOT: str = Field("uploads", env="UPLOAD_ROOT")
+    S3_BUCKET: str = Field("trcapp-uploads", env="S3_BUCKET")
+    S3_ENDPOINT_URL: Optional[str] = Field(None, env="S3_ENDPOINT_URL")
+    S3_ACCESS_KEY: Optional[str] = Field(None, env="S3_ACCESS_KEY")
+    S3_SECRET_KEY: Optional[str] = Field(None, env="S3_SECRET_KEY")
+    S3_REGION: Optional[str] = Field(None, env="S3_REGION")
+    SIGNED_URL_TTL_SECONDS: int = Field(3600, env="SIGNED_URL_TTL_SECONDS")
+
+    VIEW_FLUSH_SECONDS: int = Field(10, env="VIEW_FLUSH_SECONDS")
+    CART_RESERVATION_SWEEP_SECONDS: int = Field(60, env="CART_RESERVATION_SWEEP_SECONDS")
+    GUEST_CART_ENABLED: bool = Field(True, env="GUEST_CART_ENABLED")
+    GUEST_CART_TTL_SECONDS: int = Field(30 * 24 * 3600, env="GUEST_CART_TTL_SECONDS")
+
+    TRENDING_REFRESH_SECONDS: int = Field(300, env="TRENDING_REFRESH_SECONDS")
+    TRENDING_HALF_LIFE_HOURS: float = Field(72.0, env="TRENDING_HALF_LIFE_HOURS")
+    TRENDING_WINDOW_DAYS: int = Field(30, env="TRENDING_WINDOW_DAYS")
+
     class Config:
         env_file = ".env"
         case_sensitive = True
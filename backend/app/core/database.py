@@ -1,21 +1,146 @@
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from .config import get_settings
+from .pool import pool_options, pool_status
+
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, future=True)
+engine = create_engine(settings.DATABASE_URL, future=True, **pool_options())
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
 
+
+def _async_database_url(url: str) -> str:
+    """Switch a sync postgres URL to the asyncpg driver."""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or _async_database_url(settings.DATABASE_URL),
+    **pool_options(async_engine=True),
+)
+
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Read replica: used only by read-only routes (see get_read_db); without
+# DATABASE_REPLICA_URL those routes fall back to the primary.
+replica_engine = None
+ReplicaSessionLocal = None
+async_replica_engine = None
+AsyncReplicaSessionLocal = None
+
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = create_engine(settings.DATABASE_REPLICA_URL, future=True, **pool_options())
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine, future=True)
+    async_replica_engine = create_async_engine(
+        _async_database_url(settings.DATABASE_REPLICA_URL),
+        **pool_options(async_engine=True),
+    )
+    AsyncReplicaSessionLocal = sessionmaker(
+        bind=async_replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
 Base = declarative_base()
 
 
+class _ReplicaHealth:
+    """Cached replica lag check; the replica is used only while it is fresh enough."""
+
+    # Zero lag when everything received is replayed (an idle primary would
+    # otherwise look like a lagging replica)
+    LAG_QUERY = text(
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._healthy = False
+        self.lag_seconds = None
+
+    def is_healthy(self) -> bool:
+        if replica_engine is None:
+            return False
+        if time.monotonic() - self._checked_at < settings.REPLICA_LAG_CHECK_SECONDS:
+            return self._healthy
+        # Only one thread re-checks; the others keep using the last result
+        if not self._lock.acquire(blocking=False):
+            return self._healthy
+        try:
+            with replica_engine.connect() as conn:
+                lag = conn.execute(self.LAG_QUERY).scalar()
+            self.lag_seconds = float(lag) if lag is not None else None
+            self._healthy = self.lag_seconds is not None and self.lag_seconds <= settings.REPLICA_MAX_LAG_SECONDS
+        except SQLAlchemyError:
+            logger.warning("Replica lag check failed, using primary", exc_info=True)
+            self.lag_seconds = None
+            self._healthy = False
+        finally:
+            self._checked_at = time.monotonic()
+            self._lock.release()
+        return self._healthy
+
+
+replica_health = _ReplicaHealth()
+
+
+def get_pool_stats() -> dict:
+    """Pool status of all engines, for monitoring."""
+    stats = {
+        "sync": pool_status(engine.pool),
+        "async": pool_status(async_engine.sync_engine.pool),
+    }
+    if replica_engine is not None:
+        stats["replica"] = pool_status(replica_engine.pool)
+        stats["async_replica"] = pool_status(async_replica_engine.sync_engine.pool)
+        stats["replica_lag_seconds"] = replica_health.lag_seconds
+    return stats
+
+
 def get_db():
     """Yield database session (dependency)."""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+def get_read_db():
+    """Yield a session for read-only routes: replica if fresh, otherwise primary."""
+    session_factory = ReplicaSessionLocal if replica_health.is_healthy() else SessionLocal
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """Yield async database session (dependency) for `async def` endpoints."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """Async counterpart of get_read_db."""
+    healthy = await run_in_threadpool(replica_health.is_healthy)
+    session_factory = AsyncReplicaSessionLocal if healthy else AsyncSessionLocal
+    async with session_factory() as db:
+        yield db
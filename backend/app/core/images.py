@@ -0,0 +1,59 @@
+"""Генерация миниатюр и адаптивных вариантов изображений.
+
+Для загруженного файла (blob из /uploads) создаются уменьшенные копии в WebP
+(и AVIF, если Pillow собран с его поддержкой) нескольких ширин. Копии кладутся
+в то же хранилище рядом с оригиналом в `derived/`; имена детерминированы
+(оригиналы названы по хэшу содержимого), поэтому повторный запуск ничего не
+пересоздаёт.
+"""
+
+import io
+import posixpath
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageOps, features
+
+from app.core.storage import get_blob_store, key_from_url, url_for_key
+
+RESPONSIVE_WIDTHS = (320, 640, 1280)
+THUMBNAIL_WIDTH = RESPONSIVE_WIDTHS[0]
+QUALITY = {"webp": 80, "avif": 60}
+
+ImageVariants = Dict[str, Dict[str, str]]
+
+
+def output_formats() -> Tuple[str, ...]:
+    return ("webp", "avif") if features.check("avif") else ("webp",)
+
+
+def build_variants(image_url: str) -> Optional[Tuple[str, ImageVariants]]:
+    """Создать варианты изображения; вернуть (URL миниатюры, {формат: {ширина: URL}})."""
+    # Внешние URL не обрабатываем
+    source_key = key_from_url(image_url)
+    store = get_blob_store()
+    if not source_key or not store.exists(source_key):
+        return None
+
+    directory, filename = posixpath.split(source_key)
+    stem = posixpath.splitext(filename)[0]
+
+    variants: ImageVariants = {}
+    with Image.open(io.BytesIO(store.get_bytes(source_key))) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        for fmt in output_formats():
+            variants[fmt] = {}
+            for width in RESPONSIVE_WIDTHS:
+                # Не увеличиваем: крупнее оригинала оставляем только самый маленький размер
+                if width > image.width and width != RESPONSIVE_WIDTHS[0]:
+                    continue
+                key = posixpath.join(directory, "derived", f"{stem}_{width}.{fmt}")
+                if not store.exists(key):
+                    resized = image.copy()
+                    resized.thumbnail((width, width * 10), Image.LANCZOS)
+                    buffer = io.BytesIO()
+                    resized.save(buffer, fmt.upper(), quality=QUALITY[fmt])
+                    store.put_bytes(key, buffer.getvalue(), f"image/{fmt}")
+                variants[fmt][str(width)] = url_for_key(key)
+
+    return variants["webp"][str(THUMBNAIL_WIDTH)], variants
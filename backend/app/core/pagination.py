@@ -0,0 +1,80 @@
+"""Keyset (cursor) пагинация.
+
+Курсор — непрозрачная base64-строка со значениями ключа сортировки
+последней записи страницы (например, created_at + id). Следующая страница
+выбирается условием по кортежу ключей, поэтому стоимость запроса не зависит
+от глубины страницы.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+from app.core.exceptions import BadRequestException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Закодировать значения ключа сортировки в курсор."""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Раскодировать курсор; ожидается ровно `size` значений."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise BadRequestException("Некорректный курсор")
+    if not isinstance(values, list) or len(values) != size:
+        raise BadRequestException("Некорректный курсор")
+    return [_decode_value(v) for v in values]
+
+
+def keyset_paginate(
+    query: Query,
+    order_columns: Sequence[Any],
+    row_key: Callable[[Any], Sequence[Any]],
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    descending: bool = True,
+    skip: int = 0,
+) -> Tuple[list, Optional[str]]:
+    """Применить сортировку и keyset-фильтр, вернуть (строки, next_cursor).
+
+    `order_columns` должен заканчиваться уникальной колонкой (обычно id),
+    `row_key` возвращает значения этих колонок для строки результата.
+    `skip` оставлен для совместимости со старым offset-режимом.
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(order_columns))
+        keys = tuple_(*order_columns)
+        query = query.filter(keys < tuple_(*values) if descending else keys > tuple_(*values))
+
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in order_columns])
+    if skip and not cursor:
+        query = query.offset(skip)
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(row_key(rows[-1]))
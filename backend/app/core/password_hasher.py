@@ -0,0 +1,82 @@
+"""Ограниченный пул потоков для bcrypt.
+
+bcrypt занимает поток на сотни миллисекунд, поэтому хэширование и проверка
+паролей выполняются в отдельном пуле фиксированного размера с ограниченной
+очередью. Когда очередь заполнена, запрос сразу получает 429, а не
+занимает потоки, обслуживающие остальной API.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.core.config import get_settings
+from app.core.exceptions import TooManyRequestsException
+
+
+class PasswordHasherPool:
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        # Слоты на выполняющиеся задачи и ожидающие в очереди
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise TooManyRequestsException("Too many authentication requests, please retry")
+
+        queued_at = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def task():
+            waited = time.perf_counter() - queued_at
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        try:
+            return self._executor.submit(task).result()
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_total / started * 1000, 2) if started else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 2),
+            }
+
+
+_settings = get_settings()
+
+password_hasher = PasswordHasherPool(
+    max_workers=_settings.PASSWORD_HASH_WORKERS,
+    max_pending=_settings.PASSWORD_HASH_MAX_PENDING,
+)
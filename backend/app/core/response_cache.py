@@ -0,0 +1,92 @@
+"""Кэш ответов публичных эндпоинтов каталога.
+
+Ответы хранятся в Redis (см. `app.core.cache`) вместе с ETag; повторный
+запрос с совпадающим If-None-Match получает 304 без тела. Записи
+инвалидируются по тегам при изменении товаров/вариантов/образов в сервисах.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.cache import ITEMS_TAG, OUTFITS_TAG, cache_get, cache_set, make_key
+from app.core.pagination import NEXT_CURSOR_HEADER
+
+# Заголовки исходного ответа, которые сохраняются вместе с телом
+CACHED_HEADERS = ("content-type", NEXT_CURSOR_HEADER.lower())
+
+
+@dataclass(frozen=True)
+class CacheRule:
+    pattern: "re.Pattern"
+    ttl: int
+    tags: Tuple[str, ...]
+    anonymous_only: bool = False
+
+
+CACHE_RULES = (
+    # Список зависит от пользователя (is_favorite), поэтому только для гостей
+    CacheRule(re.compile(r"^/api/items/?$"), 60, (ITEMS_TAG,), anonymous_only=True),
+    CacheRule(re.compile(r"^/api/items/trending/?$"), 300, (ITEMS_TAG,)),
+    CacheRule(re.compile(r"^/api/items/collections/?$"), 300, (ITEMS_TAG,)),
+    CacheRule(re.compile(r"^/api/items/\d+/similar/?$"), 300, (ITEMS_TAG,)),
+    CacheRule(re.compile(r"^/api/outfits/trending/?$"), 120, (OUTFITS_TAG, ITEMS_TAG)),
+)
+
+
+def _match_rule(request: Request) -> Optional[CacheRule]:
+    if request.method != "GET":
+        return None
+    for rule in CACHE_RULES:
+        if rule.pattern.match(request.url.path):
+            if rule.anonymous_only and request.headers.get("authorization"):
+                return None
+            return rule
+    return None
+
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def _build_response(request: Request, entry: dict) -> Response:
+    headers = dict(entry["headers"])
+    headers["ETag"] = entry["etag"]
+    # Клиент всегда перепроверяет ответ, но по ETag получает 304 без тела
+    headers["Cache-Control"] = "no-cache"
+    if_none_match = request.headers.get("if-none-match", "")
+    if entry["etag"] in [tag.strip() for tag in if_none_match.split(",")]:
+        headers.pop("content-type", None)
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], status_code=200, headers=headers)
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """Кэширует успешные GET-ответы маршрутов из CACHE_RULES."""
+
+    async def dispatch(self, request: Request, call_next):
+        rule = _match_rule(request)
+        if rule is None:
+            return await call_next(request)
+
+        params = [request.url.path, sorted(request.query_params.multi_items())]
+        key = await run_in_threadpool(make_key, "response", params, rule.tags)
+        entry = await run_in_threadpool(cache_get, key)
+        if entry is None:
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            entry = {
+                "body": body.decode(),
+                "etag": _etag(body),
+                "headers": {k: v for k, v in response.headers.items() if k in CACHED_HEADERS},
+            }
+            await run_in_threadpool(cache_set, key, entry, rule.ttl)
+        return _build_response(request, entry)
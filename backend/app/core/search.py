@@ -0,0 +1,98 @@
+"""Поисковый движок каталога.
+
+Общий путь поиска для `items.service.list_items` и `ItemServiceV2.get_items`.
+Движок выбирается настройкой SEARCH_BACKEND.
+"""
+
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import Float, cast, func, or_
+from sqlalchemy.orm import Query
+
+from app.core.config import get_settings
+from app.db.models.item import Item, SEARCH_TS_CONFIG
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchEngine(ABC):
+    """Базовый интерфейс поискового движка."""
+
+    name = "base"
+
+    @abstractmethod
+    def apply(self, query: Query, text: str) -> Query:
+        """Отфильтровать запрос по поисковой строке."""
+
+    def rank(self, text: str):
+        """SQL-выражение релевантности (больше — лучше) или None."""
+        return None
+
+
+class IlikeSearchEngine(SearchEngine):
+    """Поиск подстрокой через ILIKE (без индекса, для разработки)."""
+
+    name = "ilike"
+
+    def apply(self, query: Query, text: str) -> Query:
+        term = f"%{text}%"
+        return query.filter(
+            or_(
+                Item.name.ilike(term),
+                Item.description.ilike(term),
+                Item.brand.ilike(term),
+                Item.article.ilike(term),
+            )
+        )
+
+
+class PostgresSearchEngine(SearchEngine):
+    """Полнотекстовый поиск по `items.search_vector` (GIN-индекс)."""
+
+    name = "postgres"
+
+    @staticmethod
+    def _tsquery(text: str) -> Optional[str]:
+        # Каждое слово ищется как префикс: "jack blu" -> "jack:* & blu:*"
+        tokens = _TOKEN_RE.findall(text.lower())
+        if not tokens:
+            return None
+        return " & ".join(f"{token}:*" for token in tokens)
+
+    def apply(self, query: Query, text: str) -> Query:
+        tsquery = self._tsquery(text)
+        if tsquery is None:
+            return query
+        return query.filter(
+            Item.search_vector.op("@@")(func.to_tsquery(SEARCH_TS_CONFIG, tsquery))
+        )
+
+    def rank(self, text: str):
+        tsquery = self._tsquery(text)
+        if tsquery is None:
+            return None
+        # ts_rank_cd returns float4; the cursor carries the value as a JSON
+        # double, so compare in float8 to keep ties at page boundaries exact
+        return cast(
+            func.ts_rank_cd(Item.search_vector, func.to_tsquery(SEARCH_TS_CONFIG, tsquery)),
+            Float(53),
+        )
+
+
+_ENGINES = {
+    IlikeSearchEngine.name: IlikeSearchEngine,
+    PostgresSearchEngine.name: PostgresSearchEngine,
+}
+
+
+@lru_cache(maxsize=None)
+def get_search_engine() -> SearchEngine:
+    """Return the search engine configured in settings."""
+    backend = get_settings().SEARCH_BACKEND
+    try:
+        return _ENGINES[backend]()
+    except KeyError:
+        raise ValueError(f"Unknown SEARCH_BACKEND: {backend}")
@@ -1,3 +1,5 @@
+import time
+import uuid
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 
@@ -5,12 +7,21 @@ from fastapi import HTTPException, status, Depends, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import jwt, JWTError
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from app.core.config import get_settings
 from app.core.database import get_db
 from app.db.models.user import User
+from app.core.password_hasher import password_hasher
 from app.core.redis_client import get_redis
+from app.core.token_cache import (
+    AuthCache,
+    RevocationFilter,
+    TOKEN_MESSAGE_PREFIX,
+    USER_MESSAGE_PREFIX,
+    publish,
+    token_digest,
+)
 
 settings = get_settings()
 
@@ -19,30 +30,69 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different cost are flagged as needing an update and rehashed on login
+# min_rounds makes verify_and_update flag hashes made with a lower cost, so
+# raising BCRYPT_ROUNDS upgrades stored hashes on the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
+TOKEN_BLACKLIST_PREFIX = "token_blacklist:"
+REFRESH_TOKEN_BLACKLIST_PREFIX = "refresh_token_blacklist:"
+# Tokens of a user issued at or before this unix time in milliseconds (iat_ms) are treated as revoked
+USER_TOKENS_REVOKED_BEFORE_PREFIX = "token_revoked_before:"
+
+auth_cache = AuthCache(settings.AUTH_CACHE_MAX_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def _load_revoked_tokens():
+    redis_client = get_redis()
+    for key in redis_client.scan_iter(match=f"{TOKEN_BLACKLIST_PREFIX}*", count=1000):
+        yield key[len(TOKEN_BLACKLIST_PREFIX):]
+
+
+revocation_filter = RevocationFilter(_load_revoked_tokens, auth_cache.discard_user)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.run(pwd_context.verify, plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.run(pwd_context.hash, password)
 
 
 def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.hashed_password):
+    if not user:
+        return None
+    verified, new_hash = password_hasher.run(pwd_context.verify_and_update, password, user.hashed_password)
+    if not verified:
         return None
+    if new_hash:
+        user.hashed_password = new_hash
+        db.add(user)
+        db.commit()
+        db.refresh(user)
     return user
 
 
+def _now_ms() -> int:
+    # "iat" has one-second resolution: a login in the same second as
+    # logout-all would otherwise be revoked for the token's whole lifetime
+    return time.time_ns() // 1_000_000
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire, "iat": now, "iat_ms": _now_ms(), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -55,42 +105,108 @@ def decode_token(token: str) -> dict:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
 
-def blacklist_token(token: str, ttl: int | None = None) -> None:
-    if not token:
+def token_id(payload: dict, token: str) -> str:
+    """Return the jti of a decoded token; tokens issued without one fall back to a digest."""
+    return payload.get("jti") or token_digest(token)
+
+
+def blacklist_token(jti: str, ttl: int | None = None) -> None:
+    if not jti:
         return
     redis_client = get_redis()
-    key = f"token_blacklist:{token}"
+    key = f"{TOKEN_BLACKLIST_PREFIX}{jti}"
     if ttl and ttl > 0:
         redis_client.setex(key, ttl, "1")
     else:
         redis_client.set(key, "1")
+    revocation_filter.add(jti)
+    publish(f"{TOKEN_MESSAGE_PREFIX}{jti}")
 
 
-def is_token_blacklisted(token: str) -> bool:
-    """Return True if the token is present in Redis blacklist."""
-    if not token:
+def is_token_blacklisted(jti: str) -> bool:
+    """Return True if the token id is present in Redis blacklist."""
+    if not jti:
+        return False
+    # The local bloom filter answers "not revoked" without a Redis round trip
+    if not revocation_filter.might_be_revoked(jti):
         return False
     redis_client = get_redis()
-    return redis_client.exists(f"token_blacklist:{token}") == 1
+    return redis_client.exists(f"{TOKEN_BLACKLIST_PREFIX}{jti}") == 1
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
-    if is_token_blacklisted(token):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+def revoke_user_tokens(user_id: int) -> None:
+    """Revoke every token of the user issued so far with a single write."""
+    redis_client = get_redis()
+    # Older refresh tokens are expired by the time the watermark lapses
+    ttl = int(timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS).total_seconds())
+    redis_client.setex(f"{USER_TOKENS_REVOKED_BEFORE_PREFIX}{user_id}", ttl, _now_ms())
+    invalidate_user_cache(user_id)
+
+
+def is_issued_before_revocation(payload: dict) -> bool:
+    redis_client = get_redis()
+    revoked_before = redis_client.get(f"{USER_TOKENS_REVOKED_BEFORE_PREFIX}{payload.get('sub')}")
+    if revoked_before is None:
+        return False
+    issued_at_ms = payload.get("iat_ms")
+    if issued_at_ms is None:
+        # Tokens issued before "iat_ms" existed: assume the end of their second
+        issued_at_ms = payload.get("iat", 0) * 1000 + 999
+    return issued_at_ms <= int(revoked_before)
+
+
+_USER_SNAPSHOT_COLUMNS = [column.key for column in User.__table__.columns]
+
+
+def _user_from_snapshot(db: Session, snapshot: Dict[str, Any]) -> User:
+    """Attach a cached user to the session without querying the database."""
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def invalidate_user_cache(user_id: int) -> None:
+    """Drop cached snapshots of a user in every worker after it was changed."""
+    auth_cache.discard_user(user_id)
+    publish(f"{USER_MESSAGE_PREFIX}{user_id}")
+
+
+def _user_for_token(db: Session, token: str) -> User:
+    cache_key = token_digest(token)
+    cached = auth_cache.get(cache_key)
+    if cached is not None:
+        # Bulk revocation drops the user's cache entries, so only the jti needs checking here
+        jti, snapshot = cached
+        if is_token_blacklisted(jti):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+        return _user_from_snapshot(db, snapshot)
 
     payload = decode_token(token)
+    jti = token_id(payload, token)
+    if is_token_blacklisted(jti) or is_issued_before_revocation(payload):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
     user_id: Optional[int] = payload.get("sub")
     if user_id is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
     user = db.query(User).filter(User.id == int(user_id)).first()
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    auth_cache.set(
+        cache_key,
+        jti,
+        {key: getattr(user, key) for key in _USER_SNAPSHOT_COLUMNS},
+        token_exp=payload.get("exp"),
+    )
     return user
 
 
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> User:
+    return _user_for_token(db, token)
+
+
 def is_admin(user: User) -> bool:
     if user.is_admin:
         return True
@@ -108,35 +224,36 @@ def require_admin(user: User = Depends(get_current_user)):
 def create_refresh_token(data: dict, expires_delta: timedelta | None = None):
     """Return a signed JWT refresh token."""
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
-    to_encode.update({"exp": expire, "type": "refresh"})
+    now = datetime.utcnow()
+    expire = now + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    to_encode.update({"exp": expire, "iat": now, "iat_ms": _now_ms(), "jti": uuid.uuid4().hex, "type": "refresh"})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def blacklist_refresh_token(token: str, ttl: int | None = None) -> None:
-    if not token:
+def blacklist_refresh_token(jti: str, ttl: int | None = None) -> None:
+    if not jti:
         return
     redis_client = get_redis()
-    key = f"refresh_token_blacklist:{token}"
+    key = f"{REFRESH_TOKEN_BLACKLIST_PREFIX}{jti}"
     if ttl and ttl > 0:
         redis_client.setex(key, ttl, "1")
     else:
         redis_client.set(key, "1")
 
 
-def is_refresh_token_blacklisted(token: str) -> bool:
-    if not token:
+def is_refresh_token_blacklisted(jti: str) -> bool:
+    if not jti:
         return False
     redis_client = get_redis()
-    return redis_client.exists(f"refresh_token_blacklist:{token}") == 1
+    return redis_client.exists(f"{REFRESH_TOKEN_BLACKLIST_PREFIX}{jti}") == 1
 
 
 def decode_refresh_token(token: str) -> dict:
-    if is_refresh_token_blacklisted(token):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token has been revoked")
     payload = decode_token(token)
     if payload.get("type") != "refresh":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    if is_refresh_token_blacklisted(token_id(payload, token)) or is_issued_before_revocation(payload):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token has been revoked")
     return payload
 
 
@@ -149,17 +266,7 @@ def get_current_user_optional(request: Request, db: Session = Depends(get_db)) -
     if scheme.lower() != "bearer" or not token:
         return None
 
-    if is_token_blacklisted(token):
-        return None
-
     try:
-        payload = decode_token(token)
+        return _user_for_token(db, token)
     except HTTPException:
         return None
-
-    user_id: Optional[int] = payload.get("sub")
-    if user_id is None:
-        return None
-
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    return user
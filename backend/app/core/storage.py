@@ -0,0 +1,251 @@
+"""Хранилище загруженных файлов (blob store), адресуемое по хэшу содержимого.
+
+Ключ blob'а — путь вида `items/<sha256>.jpg`; в БД хранится его публичный
+путь `/uploads/<ключ>`, одинаковый для любого бэкенда. Реализации:
+
+* `LocalBlobStore` — каталог на диске (по умолчанию `uploads/`), файлы
+  раздаёт nginx или StaticFiles;
+* `S3BlobStore` — S3-совместимое хранилище (MinIO локально); `/uploads/...`
+  отвечает редиректом на подписанный URL, байты отдаёт S3/CDN.
+
+Один blob может использоваться несколькими изображениями, поэтому число
+ссылок ведётся в таблице `blobs` (`acquire_blob` / `release_blob`), и файл
+удаляется только когда на него больше никто не ссылается.
+"""
+
+import os
+import re
+from abc import ABC, abstractmethod
+import shutil
+from functools import lru_cache
+from typing import List, Optional
+
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.models.blob import Blob
+
+URL_PREFIX = "/uploads/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# items/<sha256>.jpg и производные items/derived/<sha256>_640.webp
+_CONTENT_HASHED_KEY = re.compile(r"(^|/)[0-9a-f]{64}[^/]*$")
+
+
+def key_from_url(url: Optional[str]) -> Optional[str]:
+    """`/uploads/items/abc.jpg` -> `items/abc.jpg`; внешние URL — None."""
+    if not url or not url.startswith(URL_PREFIX):
+        return None
+    return url[len(URL_PREFIX):]
+
+
+def url_for_key(key: str) -> str:
+    return f"{URL_PREFIX}{key}"
+
+
+def is_content_hashed(key: str) -> bool:
+    return bool(_CONTENT_HASHED_KEY.search(key))
+
+
+class BlobStore(ABC):
+    """Интерфейс хранилища: все операции синхронные, из async-кода — через threadpool."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def put_file(self, path: str, key: str, content_type: Optional[str] = None) -> None:
+        """Сохранить локальный файл под ключом; исходный файл может быть перемещён."""
+
+    @abstractmethod
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        ...
+
+    @abstractmethod
+    def get_bytes(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def signed_url(self, key: str, expires_in: Optional[int] = None) -> str:
+        """URL, по которому байты отдаются в обход приложения."""
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def put_file(self, path: str, key: str, content_type: Optional[str] = None) -> None:
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.part"
+        with open(tmp_path, "wb") as out:
+            out.write(data)
+        os.replace(tmp_path, target)
+
+    def get_bytes(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as source:
+            return source.read()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def signed_url(self, key: str, expires_in: Optional[int] = None) -> str:
+        # Локальные файлы раздаются по постоянному пути /uploads
+        return url_for_key(key)
+
+
+class S3BlobStore(BlobStore):
+    def __init__(self, bucket: str, endpoint_url: Optional[str], access_key: Optional[str],
+                 secret_key: Optional[str], region: Optional[str], url_ttl: int):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError as exc:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 to be installed") from exc
+
+        self.bucket = bucket
+        self.url_ttl = url_ttl
+        self._client_error = ClientError
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            region_name=region or None,
+        )
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except self._client_error as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def _extra_args(self, content_type: Optional[str]) -> dict:
+        # Имена содержат хэш содержимого — объект никогда не меняется
+        extra = {"CacheControl": IMMUTABLE_CACHE_CONTROL}
+        if content_type:
+            extra["ContentType"] = content_type
+        return extra
+
+    def put_file(self, path: str, key: str, content_type: Optional[str] = None) -> None:
+        self._client.upload_file(path, self.bucket, key, ExtraArgs=self._extra_args(content_type))
+        os.remove(path)
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        self._client.put_object(Bucket=self.bucket, Key=key, Body=data, **self._extra_args(content_type))
+
+    def get_bytes(self, key: str) -> bytes:
+        return self._client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=key)
+
+    def signed_url(self, key: str, expires_in: Optional[int] = None) -> str:
+        return self._client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires_in or self.url_ttl,
+        )
+
+
+class UploadStaticFiles(StaticFiles):
+    """Раздача LocalBlobStore без nginx (dev): те же заголовки кэширования, что и в nginx.conf."""
+
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 206, 304) and is_content_hashed(path):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+@lru_cache()
+def get_blob_store() -> BlobStore:
+    settings = get_settings()
+    if settings.STORAGE_BACKEND == "s3":
+        return S3BlobStore(
+            bucket=settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            access_key=settings.S3_ACCESS_KEY,
+            secret_key=settings.S3_SECRET_KEY,
+            region=settings.S3_REGION,
+            url_ttl=settings.SIGNED_URL_TTL_SECONDS,
+        )
+    return LocalBlobStore(settings.UPLOAD_ROOT)
+
+
+def acquire_blob(db: Session, key: str, size: Optional[int] = None, content_type: Optional[str] = None) -> None:
+    """Увеличить счётчик ссылок на blob (в транзакции вызывающего)."""
+    stmt = insert(Blob).values(key=key, refcount=1, size=size, content_type=content_type)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[Blob.key],
+        set_={"refcount": Blob.refcount + 1},
+    ))
+
+
+def release_blob(db: Session, key: str) -> bool:
+    """Уменьшить счётчик ссылок; True, если blob больше не используется.
+
+    Строку с нулевым счётчиком удаляем сразу, а сами файлы — после commit,
+    через `delete_blobs`, чтобы откат транзакции не оставил битых ссылок.
+    """
+    refcount = db.execute(
+        update(Blob)
+        .where(Blob.key == key)
+        .values(refcount=Blob.refcount - 1)
+        .returning(Blob.refcount)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if refcount is None or refcount <= 0:
+        db.query(Blob).filter(Blob.key == key, Blob.refcount <= 0).delete(synchronize_session=False)
+        return True
+    return False
+
+
+def release_image_blobs(db: Session, image) -> List[str]:
+    """Снять ссылку изображения (ItemImage, VariantImage, OutfitImage) на его blob.
+
+    Возвращает ключи для `delete_blobs` после commit: оригинал и его
+    производные варианты, но только если blob больше никем не используется.
+    """
+    key = key_from_url(image.image_url)
+    if not key or not release_blob(db, key):
+        return []
+    derived = [image.thumbnail_url] + [
+        url for sizes in (image.variants or {}).values() for url in sizes.values()
+    ]
+    return [key] + [derived_key for derived_key in map(key_from_url, derived) if derived_key]
+
+
+def delete_blobs(*keys: Optional[str]) -> None:
+    store = get_blob_store()
+    for key in keys:
+        if key:
+            store.delete(key)
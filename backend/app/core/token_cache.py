@@ -0,0 +1,185 @@
+"""Локальные кэши для проверки access-токенов без сетевых запросов.
+
+* `AuthCache` — LRU с коротким TTL: sha256(token) -> (jti, снимок колонок User).
+* `RevocationFilter` — bloom-фильтр jti отозванных токенов в памяти процесса.
+  Заполняется из Redis при старте и пополняется через pub/sub, который
+  публикует `blacklist_token`. Отсутствие в фильтре гарантирует, что токен
+  не отозван; при попадании (или если фильтр не синхронизирован) решение
+  принимает Redis.
+
+Через тот же канал рассылается сброс снимков пользователя при изменении
+его данных или массовом отзыве его токенов, чтобы все процессы перестали
+отдавать устаревший снимок.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.config import get_settings
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = "auth:revocations"
+TOKEN_MESSAGE_PREFIX = "token:"
+USER_MESSAGE_PREFIX = "user:"
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class BloomFilter:
+    """Простой bloom-фильтр на bytearray с двойным хэшированием."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value: str) -> None:
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class RevocationFilter:
+    """Bloom-фильтр отозванных токенов, синхронизируемый с Redis."""
+
+    def __init__(self, load_revoked: Callable[[], Iterable[str]], on_user_changed: Callable[[int], None]):
+        self._load_revoked = load_revoked
+        self._on_user_changed = on_user_changed
+        self._bloom: Optional[BloomFilter] = None
+        self._ready = False
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def might_be_revoked(self, value: str) -> bool:
+        """False — точно не отозван; True — нужно спросить Redis."""
+        self._ensure_started()
+        bloom = self._bloom
+        if not self._ready or bloom is None:
+            return True
+        return value in bloom
+
+    def add(self, value: str) -> None:
+        bloom = self._bloom
+        if bloom is not None:
+            bloom.add(value)
+
+    def _ensure_started(self) -> None:
+        # Поток запускается лениво, уже в процессе воркера (после fork)
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="revocation-filter", daemon=True)
+                self._thread.start()
+
+    def _rebuild(self) -> None:
+        settings = get_settings()
+        bloom = BloomFilter(settings.REVOCATION_BLOOM_CAPACITY, settings.REVOCATION_BLOOM_ERROR_RATE)
+        for value in self._load_revoked():
+            bloom.add(value)
+        self._bloom = bloom
+
+    def _handle(self, data: str) -> None:
+        if data.startswith(TOKEN_MESSAGE_PREFIX):
+            self.add(data[len(TOKEN_MESSAGE_PREFIX):])
+        elif data.startswith(USER_MESSAGE_PREFIX):
+            self._on_user_changed(int(data[len(USER_MESSAGE_PREFIX):]))
+
+    def _run(self) -> None:
+        settings = get_settings()
+        while True:
+            pubsub = None
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                # Подписка до загрузки, чтобы не потерять отзывы между ними
+                pubsub.subscribe(REVOCATION_CHANNEL)
+                self._rebuild()
+                self._ready = True
+                rebuilt_at = time.monotonic()
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self._handle(message["data"])
+                    # Периодическая пересборка выбрасывает истёкшие записи
+                    if time.monotonic() - rebuilt_at > settings.REVOCATION_BLOOM_REBUILD_SECONDS:
+                        self._rebuild()
+                        rebuilt_at = time.monotonic()
+            except (RedisError, OSError):
+                self._ready = False
+                logger.warning("Revocation filter lost Redis, falling back to Redis checks", exc_info=True)
+                time.sleep(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except (RedisError, OSError):
+                        pass
+
+
+class AuthCache:
+    """Потокобезопасный LRU с TTL: ключ токена -> (jti, снимок пользователя)."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, jti, snapshot = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return jti, snapshot
+
+    def set(self, key: str, jti: str, snapshot: Dict, token_exp: Optional[float] = None) -> None:
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        with self._lock:
+            self._entries[key] = (expires_at, jti, snapshot)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_user(self, user_id: int) -> None:
+        with self._lock:
+            stale = [k for k, (_, _, snapshot) in self._entries.items() if snapshot.get("id") == user_id]
+            for key in stale:
+                del self._entries[key]
+
+
+def publish(message: str) -> None:
+    """Разослать сообщение всем процессам; ошибки Redis не критичны."""
+    try:
+        get_redis().publish(REVOCATION_CHANNEL, message)
+    except RedisError:
+        logger.warning("Failed to publish %s", message, exc_info=True)
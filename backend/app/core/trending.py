@@ -0,0 +1,84 @@
+"""Предрасчитанные рейтинги популярности (trending).
+
+Периодическая задача Celery считает для товаров (по добавлениям в избранное)
+и образов (по просмотрам) сумму весов событий с экспоненциальным затуханием
+по возрасту и сохраняет результат в sorted set Redis. Эндпоинты читают
+top-N через ZREVRANGE, не агрегируя таблицы событий на каждый запрос.
+"""
+
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.redis_client import get_redis
+from app.db.models.associations import user_favorite_items, OutfitView
+
+logger = logging.getLogger(__name__)
+
+TRENDING_ITEMS_KEY = "trending:items"
+TRENDING_OUTFITS_KEY = "trending:outfits"
+
+
+def _decayed_score(timestamp_column, half_life_hours: float):
+    """Сумма exp(-ln2 * возраст / период полураспада) по событиям."""
+    age_hours = func.extract("epoch", func.now() - timestamp_column) / 3600.0
+    return func.sum(func.exp(-math.log(2) * age_hours / half_life_hours))
+
+
+def _store_scores(key: str, scores: dict) -> None:
+    """Атомарно заменить sorted set: запись во временный ключ + RENAME."""
+    redis_client = get_redis()
+    if not scores:
+        redis_client.delete(key)
+        return
+    tmp_key = f"{key}:tmp"
+    pipe = redis_client.pipeline()
+    pipe.delete(tmp_key)
+    pipe.zadd(tmp_key, scores)
+    pipe.rename(tmp_key, key)
+    pipe.execute()
+
+
+def refresh_trending_scores(db: Session) -> dict:
+    """Пересчитать рейтинги товаров и образов. Возвращает размеры наборов."""
+    settings = get_settings()
+    since = datetime.utcnow() - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    half_life = settings.TRENDING_HALF_LIFE_HOURS
+
+    item_scores = dict(
+        db.query(
+            user_favorite_items.c.item_id,
+            _decayed_score(user_favorite_items.c.created_at, half_life),
+        )
+        .filter(user_favorite_items.c.created_at >= since)
+        .group_by(user_favorite_items.c.item_id)
+        .all()
+    )
+    outfit_scores = dict(
+        db.query(OutfitView.outfit_id, _decayed_score(OutfitView.viewed_at, half_life))
+        .filter(OutfitView.viewed_at >= since)
+        .group_by(OutfitView.outfit_id)
+        .all()
+    )
+
+    _store_scores(TRENDING_ITEMS_KEY, {str(k): float(v) for k, v in item_scores.items()})
+    _store_scores(TRENDING_OUTFITS_KEY, {str(k): float(v) for k, v in outfit_scores.items()})
+    return {"items": len(item_scores), "outfits": len(outfit_scores)}
+
+
+def top_ids(key: str, limit: int) -> Optional[List[int]]:
+    """Top-N id по рейтингу; None, если рейтинг ещё не посчитан или Redis недоступен."""
+    try:
+        redis_client = get_redis()
+        if not redis_client.exists(key):
+            return None
+        return [int(member) for member in redis_client.zrevrange(key, 0, limit - 1)]
+    except RedisError:
+        logger.warning("Trending scores unavailable, falling back to live query", exc_info=True)
+        return None
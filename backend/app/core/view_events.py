@@ -0,0 +1,129 @@
+"""Буферизованная запись истории просмотров.
+
+Страницы товара и образа не пишут в БД: просмотр кладётся в хэш Redis
+(`поле = "user_id:object_id"`, значение — время последнего просмотра), так
+что повторные просмотры одного объекта схлопываются ещё до записи.
+Периодическая задача Celery забирает накопленное и пишет одним запросом:
+для товаров — upsert в `user_view_history` (одна строка на пару), для
+образов — вставка строк в `outfit_view_history`.
+
+Если Redis недоступен, событие пишется в БД сразу, как раньше.
+"""
+
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+from redis.exceptions import RedisError
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.redis_client import get_redis
+from app.db.models.associations import UserView, OutfitView
+from app.db.models.item import Item
+from app.db.models.outfit import Outfit
+from app.db.models.user import User
+
+logger = logging.getLogger(__name__)
+
+ITEM_VIEWS_KEY = "views:pending:items"
+OUTFIT_VIEWS_KEY = "views:pending:outfits"
+
+ViewBatch = Dict[Tuple[int, int], datetime]
+
+
+def _push(key: str, user_id: int, object_id: int) -> None:
+    get_redis().hset(key, f"{user_id}:{object_id}", time.time())
+
+
+def record_item_view(db: Session, user_id: int, item_id: int) -> None:
+    try:
+        _push(ITEM_VIEWS_KEY, user_id, item_id)
+    except RedisError:
+        logger.warning("View buffer unavailable, writing item view directly", exc_info=True)
+        _upsert_item_views(db, {(user_id, item_id): datetime.now(timezone.utc)})
+        db.commit()
+
+
+def record_outfit_view(db: Session, user_id: int, outfit_id: int) -> None:
+    try:
+        _push(OUTFIT_VIEWS_KEY, user_id, outfit_id)
+    except RedisError:
+        logger.warning("View buffer unavailable, writing outfit view directly", exc_info=True)
+        _insert_outfit_views(db, {(user_id, outfit_id): datetime.now(timezone.utc)})
+        db.commit()
+
+
+def _existing_pairs(db: Session, views: ViewBatch, model) -> ViewBatch:
+    """Отбросить события по удалённым пользователям и объектам, чтобы не ронять всю пачку на FK."""
+    user_ids = {user_id for user_id, _ in views}
+    object_ids = {object_id for _, object_id in views}
+    known_users = {row[0] for row in db.query(User.id).filter(User.id.in_(user_ids))}
+    known_objects = {row[0] for row in db.query(model.id).filter(model.id.in_(object_ids))}
+    return {
+        (user_id, object_id): viewed_at
+        for (user_id, object_id), viewed_at in views.items()
+        if user_id in known_users and object_id in known_objects
+    }
+
+
+def _upsert_item_views(db: Session, views: ViewBatch) -> int:
+    views = _existing_pairs(db, views, Item)
+    if not views:
+        return 0
+    stmt = insert(UserView).values([
+        {"user_id": user_id, "item_id": item_id, "viewed_at": viewed_at}
+        for (user_id, item_id), viewed_at in views.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserView.user_id, UserView.item_id],
+        set_={"viewed_at": func.greatest(UserView.viewed_at, stmt.excluded.viewed_at)},
+    )
+    db.execute(stmt)
+    return len(views)
+
+
+def _insert_outfit_views(db: Session, views: ViewBatch) -> int:
+    views = _existing_pairs(db, views, Outfit)
+    if not views:
+        return 0
+    db.execute(insert(OutfitView).values([
+        {"user_id": user_id, "outfit_id": outfit_id, "viewed_at": viewed_at}
+        for (user_id, outfit_id), viewed_at in views.items()
+    ]))
+    return len(views)
+
+
+def _drain(key: str) -> Tuple[str, ViewBatch]:
+    """Забрать накопленные события: RENAME в ключ обработки делает срез атомарным."""
+    redis_client = get_redis()
+    processing_key = f"{key}:flushing"
+    # Пачка, оставшаяся от неудачного сброса, обрабатывается первой
+    if not redis_client.exists(processing_key):
+        if not redis_client.exists(key):
+            return processing_key, {}
+        redis_client.rename(key, processing_key)
+    views: ViewBatch = {}
+    for field, value in redis_client.hgetall(processing_key).items():
+        user_id, object_id = field.split(":", 1)
+        views[(int(user_id), int(object_id))] = datetime.fromtimestamp(float(value), tz=timezone.utc)
+    return processing_key, views
+
+
+def flush_view_events(db: Session) -> dict:
+    result = {}
+    for key, writer in ((ITEM_VIEWS_KEY, _upsert_item_views), (OUTFIT_VIEWS_KEY, _insert_outfit_views)):
+        processing_key, views = _drain(key)
+        written = 0
+        if views:
+            try:
+                written = writer(db, views)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        get_redis().delete(processing_key)
+        result[key] = written
+    return result
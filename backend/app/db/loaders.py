@@ -0,0 +1,19 @@
+"""Профили загрузки связей для моделей ответа.
+
+Каждый профиль — набор опций selectinload, которые нужны для сериализации
+соответствующей схемы без ленивых запросов на каждую строку. Число SQL
+запросов на страницу при этом постоянно: основной SELECT плюс по одному
+SELECT ... WHERE id IN (...) на каждую коллекцию.
+"""
+
+from sqlalchemy.orm import selectinload
+
+from app.db.models.item import Item
+
+
+def item_out_options() -> list:
+    """Связи, которые читает `ItemOut`: image_urls и variants."""
+    return [
+        selectinload(Item.images),
+        selectinload(Item.variants),
+    ]
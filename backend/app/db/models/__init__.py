@@ -1,4 +1,4 @@
-from . import item, item_image, outfit, user, associations, comment, variant, cart, preferences 
+from . import item, item_image, outfit, user, associations, comment, variant, cart, preferences, blob 
 from .associations import *
 from .user import User
 from .item import Item
@@ -9,4 +9,5 @@ from .outfit import Outfit, OutfitItem
 from .outfit_image import OutfitImage
 from .cart import CartItem
 from .comment import Comment
-from .preferences import Color, Brand 
\ No newline at end of file
+from .preferences import Color, Brand
+from .blob import Blob 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Table, Column, Integer, ForeignKey, DateTime, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -31,6 +31,7 @@ comment_likes = Table(
 
 class UserView(Base):
     __tablename__ = "user_view_history"
+    __table_args__ = (UniqueConstraint("user_id", "item_id", name="uq_user_view_history_user_item"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class Blob(Base):
+    """Загруженный файл в хранилище и число изображений, которые на него ссылаются."""
+
+    __tablename__ = "blobs"
+
+    key = Column(String(255), primary_key=True)  # Путь в хранилище, например items/<sha256>.jpg
+    refcount = Column(Integer, nullable=False, default=0)
+    size = Column(Integer, nullable=True)
+    content_type = Column(String(100), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
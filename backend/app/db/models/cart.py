@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint, CheckConstraint, Float, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint, CheckConstraint, Float, String, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -30,7 +30,10 @@ class CartItem(Base):
     __table_args__ = (
         UniqueConstraint("user_id", "variant_id", name="uq_cart_user_variant"),
         CheckConstraint("quantity > 0", name="ck_cart_quantity_positive"),
+        Index("ix_cart_items_reservation_expiry", "is_reserved", "reserved_until"),
     )
+    # id/added_at возвращаются через RETURNING прямо в INSERT
+    __mapper_args__ = {"eager_defaults": True}
     
     @property
     def subtotal(self):
@@ -1,11 +1,16 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, JSON, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 from app.core.database import Base
 from app.db.models.associations import user_favorite_items
 from app.db.models.variant import ItemVariant
 
+# Конфигурация to_tsvector для поискового индекса; запросы должны использовать ту же
+SEARCH_TS_CONFIG = "simple"
+
+
 class Item(Base):
     __tablename__ = "items"
 
@@ -34,6 +39,23 @@ class Item(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Поисковый вектор, поддерживается самой БД (generated column).
+    # deferred: в SELECT попадает только в условии поиска и ранжировании
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_TS_CONFIG}', coalesce(name, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_TS_CONFIG}', coalesce(brand, '') || ' ' || coalesce(article, '')), 'B') || "
+            f"setweight(to_tsvector('{SEARCH_TS_CONFIG}', coalesce(description, '')), 'C')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+
+    __table_args__ = (
+        Index("ix_items_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
     liked_by = relationship(
         "User",
         secondary=user_favorite_items,
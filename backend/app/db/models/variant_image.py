@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -13,6 +13,7 @@ class VariantImage(Base):
     variant_id = Column(Integer, ForeignKey("item_variants.id", ondelete="CASCADE"), nullable=False, index=True)
     image_url = Column(String(255), nullable=False)
     thumbnail_url = Column(String(255), nullable=True)  # Миниатюра
+    variants = Column(JSON, nullable=True)  # {"webp": {"320": url, ...}, "avif": {...}}
     alt_text = Column(String(255), nullable=True)  # Alt текст для SEO
     order = Column(Integer, default=0)  # Порядок отображения
     
@@ -1,30 +1,47 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import Depends
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import RedirectResponse
 
+# Makes the configured Celery app current so tasks can be queued with .delay()
+import celery_app  # noqa: F401
 from app.api.v1.api import api_router as api_v1_router
 from app.api.v1.endpoints.profile.schemas import ProfileOut
 from app.core.config import get_settings
-from app.core.database import Base, engine
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.api.v1.endpoints.cart.store import GUEST_CART_HEADER
+from app.core.response_cache import ResponseCacheMiddleware
+from app.core.database import Base, engine, get_pool_stats
+from app.core.password_hasher import password_hasher
 from app.core.security import get_current_user, get_password_hash
+from app.core.storage import UploadStaticFiles, get_blob_store
 from app.db.models.user import User
 
 settings = get_settings()
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
+if settings.RESPONSE_CACHE_ENABLED:
+    app.add_middleware(ResponseCacheMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.BACKEND_CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, GUEST_CART_HEADER, "ETag"],
 )
 
 app.include_router(api_v1_router, prefix="/api")
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+if settings.STORAGE_BACKEND == "local":
+    app.mount("/uploads", UploadStaticFiles(directory=settings.UPLOAD_ROOT), name="uploads")
+else:
+    @app.get("/uploads/{key:path}", include_in_schema=False)
+    def redirect_upload(key: str):
+        # Байты отдаёт хранилище; ссылка в БД остаётся стабильной
+        return RedirectResponse(get_blob_store().signed_url(key), status_code=307)
 
 @app.on_event("startup")
 def create_default_admin():
@@ -56,6 +73,14 @@ async def health_check():
 async def readiness_check():
     return {"status": "ok", "message": "Service is ready"}
 
+@app.get("/api/health/db-pool")
+async def db_pool_stats():
+    return get_pool_stats()
+
+@app.get("/api/health/password-hasher")
+async def password_hasher_stats():
+    return password_hasher.stats()
+
 @app.get("/api/me", response_model=ProfileOut)
 async def get_me(user: User = Depends(get_current_user)):
     return ProfileOut.from_orm(user)
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""Точка входа HTTP-сервера: `python -m app.server`.
+
+Режим выбирается настройкой SERVER_MODE:
+
+* `production` — gunicorn как менеджер процессов с uvicorn-воркерами
+  (uvloop + httptools). Число воркеров берётся из WEB_CONCURRENCY или из
+  числа доступных CPU. По SIGTERM gunicorn перестаёт принимать соединения
+  и ждёт завершения текущих запросов до SERVER_GRACEFUL_TIMEOUT_SECONDS.
+* `development` — один процесс uvicorn с `--reload`.
+"""
+
+import multiprocessing
+import os
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+APP_URI = "app.main:app"
+
+
+def _available_cpus() -> int:
+    # Учитывает ограничение по CPU affinity (cpuset контейнера)
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+def worker_count() -> int:
+    if settings.WEB_CONCURRENCY > 0:
+        return settings.WEB_CONCURRENCY
+    # Воркеры асинхронные, поэтому одного на CPU достаточно
+    return max(2, _available_cpus())
+
+
+def gunicorn_options() -> dict:
+    return {
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": worker_count(),
+        "worker_class": "app.server.UvicornWorker",
+        "keepalive": settings.SERVER_KEEPALIVE_SECONDS,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        "timeout": settings.SERVER_TIMEOUT_SECONDS,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        # Backend стоит за nginx, который проставляет X-Forwarded-*
+        "forwarded_allow_ips": "*",
+        "accesslog": "-",
+        "errorlog": "-",
+    }
+
+
+try:
+    from uvicorn.workers import UvicornWorker as _BaseUvicornWorker
+except ImportError:  # development-only окружение без gunicorn
+    _BaseUvicornWorker = None
+
+if _BaseUvicornWorker is not None:
+    class UvicornWorker(_BaseUvicornWorker):
+        CONFIG_KWARGS = {
+            "loop": "uvloop",
+            "http": "httptools",
+            "proxy_headers": True,
+            "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        }
+
+
+def run_production() -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in gunicorn_options().items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    Application().run()
+
+
+def run_development() -> None:
+    import uvicorn
+
+    uvicorn.run(
+        APP_URI,
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        reload=True,
+        proxy_headers=True,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+    )
+
+
+def main() -> None:
+    if settings.SERVER_MODE == "development":
+        run_development()
+    else:
+        run_production()
+
+
+if __name__ == "__main__":
+    main()
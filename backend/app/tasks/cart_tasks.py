@@ -0,0 +1,14 @@
+from celery import shared_task
+
+from app.core.database import SessionLocal
+from app.api.v1.endpoints.cart.service import CartService
+
+
+@shared_task
+def release_expired_reservations() -> dict:
+    """Return stock held by expired cart reservations across all users."""
+    db = SessionLocal()
+    try:
+        return CartService.release_expired_reservations(db)
+    finally:
+        db.close()
@@ -0,0 +1,63 @@
+import logging
+from typing import Iterable
+
+from celery import shared_task
+
+from app.core.cache import ITEMS_TAG, OUTFITS_TAG, invalidate_tags
+from app.core.database import SessionLocal
+from app.core.images import build_variants
+from app.db.models.item_image import ItemImage
+from app.db.models.outfit_image import OutfitImage
+from app.db.models.variant_image import VariantImage
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MODELS = {
+    "item": (ItemImage, ITEMS_TAG),
+    "variant": (VariantImage, ITEMS_TAG),
+    "outfit": (OutfitImage, OUTFITS_TAG),
+}
+
+
+@shared_task
+def generate_image_variants(kind: str, image_id: int) -> dict:
+    """Create the thumbnail and responsive WebP/AVIF copies for one image row."""
+    model, tag = IMAGE_MODELS[kind]
+    db = SessionLocal()
+    try:
+        image = db.get(model, image_id)
+        if image is None:
+            return {"kind": kind, "id": image_id, "status": "missing"}
+        result = build_variants(image.image_url)
+        if result is None:
+            return {"kind": kind, "id": image_id, "status": "skipped"}
+        image.thumbnail_url, image.variants = result
+        db.commit()
+        invalidate_tags(tag)
+        return {"kind": kind, "id": image_id, "status": "ok"}
+    finally:
+        db.close()
+
+
+@shared_task
+def backfill_image_variants() -> dict:
+    """Queue variant generation for every image that has no thumbnail yet."""
+    db = SessionLocal()
+    try:
+        queued = {}
+        for kind, (model, _) in IMAGE_MODELS.items():
+            ids = [row[0] for row in db.query(model.id).filter(model.thumbnail_url.is_(None))]
+            enqueue_image_variants(kind, ids)
+            queued[kind] = len(ids)
+        return queued
+    finally:
+        db.close()
+
+
+def enqueue_image_variants(kind: str, image_ids: Iterable[int]) -> None:
+    """Schedule variant generation; a broker outage must not fail the upload itself."""
+    for image_id in image_ids:
+        try:
+            generate_image_variants.delay(kind, image_id)
+        except Exception:
+            logger.warning("Failed to queue image variants for %s image %s", kind, image_id, exc_info=True)
@@ -0,0 +1,14 @@
+from celery import shared_task
+
+from app.core.database import SessionLocal
+from app.core.trending import refresh_trending_scores
+
+
+@shared_task
+def refresh_trending() -> dict:
+    """Recompute time-decayed trending scores for items and outfits."""
+    db = SessionLocal()
+    try:
+        return refresh_trending_scores(db)
+    finally:
+        db.close()
@@ -0,0 +1,14 @@
+from celery import shared_task
+
+from app.core.database import SessionLocal
+from app.core.view_events import flush_view_events
+
+
+@shared_task
+def flush_views() -> dict:
+    """Write buffered item and outfit views to the database in bulk."""
+    db = SessionLocal()
+    try:
+        return flush_view_events(db)
+    finally:
+        db.close()
@@ -8,6 +8,13 @@ celery = Celery(
     "trcapp",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.REDIS_URL,
+    include=[
+        "app.tasks.ai_tasks",
+        "app.tasks.trending_tasks",
+        "app.tasks.view_tasks",
+        "app.tasks.cart_tasks",
+        "app.tasks.image_tasks",
+    ],
 )
 
 celery.conf.update(
@@ -16,4 +23,18 @@ celery.conf.update(
     accept_content=["json"],
     timezone="UTC",
     enable_utc=True,
+    beat_schedule={
+        "refresh-trending": {
+            "task": "app.tasks.trending_tasks.refresh_trending",
+            "schedule": settings.TRENDING_REFRESH_SECONDS,
+        },
+        "flush-views": {
+            "task": "app.tasks.view_tasks.flush_views",
+            "schedule": settings.VIEW_FLUSH_SECONDS,
+        },
+        "release-expired-reservations": {
+            "task": "app.tasks.cart_tasks.release_expired_reservations",
+            "schedule": settings.CART_RESERVATION_SWEEP_SECONDS,
+        },
+    },
 )
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from app.core.exceptions import TooManyRequestsException
+from app.core.password_hasher import PasswordHasherPool
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.01)
+
+
+def _fill(pool, release):
+    """Занять все слоты пула задачами, ждущими `release`; вернуть потоки."""
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(pool.run(release.wait, 5)))
+        for _ in range(pool.max_workers + pool.max_pending)
+    ]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: pool.stats()["running"] == pool.max_workers
+              and pool.stats()["queued"] == pool.max_pending)
+    return threads, results
+
+
+def test_saturated_pool_rejects_with_429_and_recovers():
+    pool = PasswordHasherPool(max_workers=2, max_pending=1)
+    release = threading.Event()
+    threads, results = _fill(pool, release)
+
+    with pytest.raises(TooManyRequestsException) as exc_info:
+        pool.run(lambda: "unreachable")
+    assert exc_info.value.status_code == 429
+    assert pool.stats()["rejected"] == 1
+
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert results == [True, True, True]
+
+    # Все слоты вернулись: пул снова принимает полную нагрузку
+    release.clear()
+    threads, results = _fill(pool, release)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert pool.run(lambda: "ok") == "ok"
+    assert pool.stats()["completed"] == 7
+
+
+def test_slot_is_released_when_the_task_raises():
+    pool = PasswordHasherPool(max_workers=1, max_pending=0)
+
+    def fail():
+        raise ValueError("boom")
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            pool.run(fail)
+    assert pool.run(lambda: "ok") == "ok"
+    assert pool.stats()["running"] == 0
+    assert pool.stats()["rejected"] == 0
+
+
+class _FakeQuery:
+    def __init__(self, user):
+        self._user = user
+
+    def filter(self, *args):
+        return self
+
+    def first(self):
+        return self._user
+
+
+class _FakeSession:
+    """Минимальная сессия для authenticate_user: один пользователь и счётчик commit."""
+
+    def __init__(self, user):
+        self._user = user
+        self.commits = 0
+
+    def query(self, model):
+        return _FakeQuery(self._user)
+
+    def add(self, obj):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def refresh(self, obj):
+        pass
+
+
+def test_authenticate_user_rehashes_weaker_hash():
+    from passlib.hash import bcrypt
+
+    from app.core import security
+    from app.db.models.user import User
+
+    weak_hash = bcrypt.using(rounds=4).hash("secret")
+    user = User(email="user@example.com", hashed_password=weak_hash)
+    db = _FakeSession(user)
+
+    assert security.authenticate_user(db, "user@example.com", "secret") is user
+    assert user.hashed_password != weak_hash
+    assert security.pwd_context.verify("secret", user.hashed_password)
+    assert not security.pwd_context.needs_update(user.hashed_password)
+    assert db.commits == 1
+
+    # Хэш уже с нужной стоимостью: повторный вход ничего не пишет
+    assert security.authenticate_user(db, "user@example.com", "secret") is user
+    assert db.commits == 1
+    assert security.authenticate_user(db, "user@example.com", "wrong") is None
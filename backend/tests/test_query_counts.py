@@ -0,0 +1,133 @@
+"""Регрессия N+1: число SQL-запросов на страницу не зависит от её размера.
+
+Нужна отдельная PostgreSQL (tsvector, ON CONFLICT): TEST_DATABASE_URL.
+Схема пересоздаётся через metadata, поэтому не указывайте рабочую базу.
+"""
+
+import os
+from contextlib import contextmanager
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if not TEST_DATABASE_URL:
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.api.v1.endpoints.cart.router import _cart_response  # noqa: E402
+from app.api.v1.endpoints.cart.service import CartService  # noqa: E402
+from app.api.v1.endpoints.items import service as items_service  # noqa: E402
+from app.api.v1.endpoints.items import service_v2  # noqa: E402
+from app.api.v1.endpoints.items.schemas import ItemOut  # noqa: E402
+from app.core.database import Base  # noqa: E402
+from app.db.models import CartItem, Item, ItemImage, ItemVariant, User  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine(TEST_DATABASE_URL, future=True)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(bind=connection, future=True)()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _seed_items(db, count, offset=0):
+    items = []
+    for n in range(offset, offset + count):
+        item = Item(name=f"Item {n}", category="tops", base_price=10.0 + n)
+        item.variants = [
+            ItemVariant(size=size, color="black", sku=f"SKU-{n}-{size}", price=10.0 + n, stock=5)
+            for size in ("S", "M")
+        ]
+        item.images = [
+            ItemImage(image_url=f"/uploads/items/{n}-{i}.jpg", order=i, is_primary=i == 0)
+            for i in range(2)
+        ]
+        items.append(item)
+    db.add_all(items)
+    db.flush()
+    return items
+
+
+def _list_v1(db):
+    items, _ = items_service.list_items(db, {}, limit=100)
+    return [ItemOut.from_orm(item) for item in items]
+
+
+def _list_v2(db):
+    result = service_v2.ItemServiceV2.get_items(db, limit=100)
+    return [ItemOut.from_orm(item) for item in result["items"]]
+
+
+def _count(engine, db, run):
+    # Пустая identity map: всё, что нужно ответу, должно прийти запросами
+    db.expunge_all()
+    with count_queries(engine) as statements:
+        run()
+    return len(statements)
+
+
+@pytest.mark.parametrize("list_page", [_list_v1, _list_v2], ids=["items_v1", "items_v2"])
+def test_item_list_query_count_is_constant(engine, db, list_page, monkeypatch):
+    # Агрегации v2 кэшируются в Redis; здесь считаем только запросы к БД
+    monkeypatch.setattr(service_v2, "cache_get", lambda key: None)
+    monkeypatch.setattr(service_v2, "cache_set", lambda key, value, ttl: None)
+
+    _seed_items(db, 3)
+    small = _count(engine, db, lambda: list_page(db))
+    _seed_items(db, 27, offset=3)
+    large = _count(engine, db, lambda: list_page(db))
+    assert small == large, f"{small} queries for 3 items, {large} for 30"
+
+
+def test_cart_query_count_is_constant(engine, db):
+    user = User(email="cart@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    user_id = user.id
+
+    def add_lines(items):
+        db.add_all(
+            CartItem(user_id=user_id, variant_id=item.variants[0].id, quantity=1, price_at_time=item.base_price)
+            for item in items
+        )
+        db.flush()
+
+    def read_cart():
+        _cart_response(CartService.get_cart_items(db, user_id))
+
+    add_lines(_seed_items(db, 3))
+    small = _count(engine, db, read_cart)
+    add_lines(_seed_items(db, 27, offset=3))
+    large = _count(engine, db, read_cart)
+    # Позиции, варианты, товары и основное изображение — одним SELECT
+    assert small == large == 1, f"{small} queries for 3 lines, {large} for 30"
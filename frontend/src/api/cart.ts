@@ -2,6 +2,7 @@ import api from './client';
 import type { 
   CartResponse, 
   CartItemCreate, 
+  CartBulkAdd,
   CartItemUpdate, 
   CartItemResponse, 
   CartSummary,
@@ -21,6 +22,12 @@ export const cartApi = {
     return response.data;
   },
 
+  // Добавить несколько товаров одним запросом (все или ни одного)
+  bulkAddToCart: async (data: CartBulkAdd): Promise<CartResponse> => {
+    const response = await api.post<CartResponse>('/api/cart/bulk', data);
+    return response.data;
+  },
+
   // Обновить товар в корзине
   updateCartItem: async (itemId: number, data: CartItemUpdate): Promise<CartItemResponse> => {
     const response = await api.patch<CartItemResponse>(`/api/cart/${itemId}`, data);
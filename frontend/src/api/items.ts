@@ -22,6 +22,12 @@ export interface ListItemsParams {
   size?: string
   sort_by?: string
   clothing_type?: ClothingType
+  cursor?: string
+}
+
+export interface Page<T> {
+  items: T[]
+  nextCursor: string | null
 }
 
 export const listItems = async (params: ListItemsParams = {}) => {
@@ -29,6 +35,12 @@ export const listItems = async (params: ListItemsParams = {}) => {
   return resp.data
 }
 
+// Cursor-based page for infinite scroll: pass nextCursor back as `cursor`
+export const listItemsPage = async (params: ListItemsParams = {}): Promise<Page<ItemOut>> => {
+  const resp = await api.get<ItemOut[]>('/api/items/', { params })
+  return { items: resp.data, nextCursor: resp.headers['x-next-cursor'] ?? null }
+}
+
 export const getItem = async (id: number) => {
   const resp = await api.get<ItemOut>(`/api/items/${id}`)
   return resp.data
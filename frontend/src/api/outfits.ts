@@ -1,4 +1,5 @@
 import api from './client'
+import type { Page } from './items'
 import {
   type OutfitCommentCreate,
   type OutfitCommentOut,
@@ -16,6 +17,7 @@ export interface ListOutfitsParams {
   min_price?: number
   max_price?: number
   sort_by?: string
+  cursor?: string
 }
 
 export const listOutfits = async (params: ListOutfitsParams = {}) => {
@@ -23,6 +25,12 @@ export const listOutfits = async (params: ListOutfitsParams = {}) => {
   return resp.data
 }
 
+// Cursor-based page for infinite scroll: pass nextCursor back as `cursor`
+export const listOutfitsPage = async (params: ListOutfitsParams = {}): Promise<Page<OutfitOut>> => {
+  const resp = await api.get<OutfitOut[]>('/api/outfits/', { params })
+  return { items: resp.data, nextCursor: resp.headers['x-next-cursor'] ?? null }
+}
+
 export const getOutfit = async (id: number) => {
   const resp = await api.get<OutfitOut>(`/api/outfits/${id}`)
   return resp.data
@@ -64,6 +64,15 @@ export interface VariantOut {
   id: number;
 }
 
+export interface ItemImageOut {
+  id: number;
+  image_url: string;
+  thumbnail_url?: string;
+  // { webp: { "320": url, ... }, avif: { ... } }
+  variants?: Record<string, Record<string, string>>;
+  is_primary?: boolean;
+}
+
 export interface ItemOut {
   name: string;
   brand?: string;
@@ -81,6 +90,7 @@ export interface ItemOut {
   created_at?: string;
   updated_at?: string;
   image_urls?: string[];
+  images?: ItemImageOut[];
   variants?: VariantOut[];
   is_favorite?: boolean;
 }
@@ -282,6 +292,10 @@ export interface CartItemCreate {
   notes?: string;
 }
 
+export interface CartBulkAdd {
+  items: CartItemCreate[];
+}
+
 export interface CartItemUpdate {
   quantity?: number;
   notes?: string;